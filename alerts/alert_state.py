@@ -0,0 +1,170 @@
+"""
+提醒状态模块 - 按品种、按触发原因记录提醒状态，避免重复提醒
+每个 (品种, 原因) 是一个两状态的状态机：
+- 空闲 → 触发：条件满足时发送提醒（距上次提醒不足冷却时间时除非程度加深，否则不发送）
+- 触发 → 触发：条件持续满足时只在程度加深（升级）时再次提醒
+- 触发 → 空闲：程度回落到触发线以下一段距离（滞回区间）才解除，避免在阈值附近反复提醒
+"""
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+# 每次运行都会刷新 last_seen，已加入 .gitignore，定时任务通过 Actions 缓存在运行之间保留
+ALERT_STATE_FILE = os.path.join('data', 'alert_state.json')
+
+# 长时间未出现的品种状态在保存时清理（秒）
+STATE_RETENTION_SECONDS = 7 * 24 * 3600
+
+# 提醒等级高低
+LEVEL_RANK = {'none': 0, 'low': 1, 'medium': 2, 'high': 3}
+
+
+def alert_signal(reason: str, severity: float, trigger_at: float, level: str, message: str,
+                 triggered: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    生成一条提醒信号（无论是否满足条件，每次分析都应给出，以便状态机判断何时解除）
+
+    Args:
+        reason: 原因代码，如 new_low、drop、volatility
+        severity: 程度（百分比，越大越严重）
+        trigger_at: 触发线，用于计算解除提醒的滞回区间
+        level: 提醒等级
+        message: 提醒原因描述
+        triggered: 分析结果是否满足条件，默认为 severity 不低于 trigger_at
+    """
+    return {
+        'reason': reason,
+        'severity': round(severity, 4),
+        'trigger_at': round(trigger_at, 4),
+        'triggered': severity >= trigger_at if triggered is None else bool(triggered),
+        'level': level,
+        'message': message,
+    }
+
+
+class AlertStateMachine:
+    """持久化的提醒状态机"""
+
+    def __init__(self, path: Optional[str] = ALERT_STATE_FILE, cooldown_seconds: float = 6 * 3600,
+                 hysteresis: float = 0.5, escalation_step: float = 1.0,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化提醒状态机
+
+        Args:
+            path: 状态文件路径，None 表示只保存在内存中
+            cooldown_seconds: 解除后再次触发时的冷却时间（秒），冷却期内只有程度加深才提醒
+            hysteresis: 滞回区间（百分点），程度低于触发线减去该值才解除
+            escalation_step: 升级步长（百分点），程度比上次提醒时加深该值以上才再次提醒
+            logger: 日志记录器
+        """
+        self.path = path
+        self.cooldown_seconds = cooldown_seconds
+        self.hysteresis = hysteresis
+        self.escalation_step = escalation_step
+        self.logger = logger or logging.getLogger(__name__)
+        self.states: Dict[str, Dict[str, Any]] = self._load()
+        self.sent = 0
+        self.suppressed = 0
+
+    def evaluate(self, instrument: str, signal: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        更新单个 (品种, 原因) 的状态
+
+        Args:
+            instrument: 品种代码
+            signal: alert_signal 生成的提醒信号
+            now: 当前时间戳
+
+        Returns:
+            是否需要发送提醒
+        """
+        now = now if now is not None else time.time()
+        key = f"{instrument}:{signal['reason']}"
+        severity = signal['severity']
+        trigger_at = signal['trigger_at']
+        state = self.states.setdefault(key, {'active': False})
+        state['last_seen'] = now
+
+        if not signal['triggered']:
+            if state['active'] and severity < trigger_at - self.hysteresis:
+                state['active'] = False
+                state['cleared_at'] = now
+                self.logger.info(f"{key} 已恢复正常，解除提醒状态")
+            return False
+
+        last_severity = state.get('severity')
+        escalated = last_severity is not None and severity >= last_severity + self.escalation_step
+        if state['active']:
+            send = escalated
+        else:
+            state['active'] = True
+            cooling = now - state.get('alerted_at', 0) < self.cooldown_seconds
+            send = not cooling or last_severity is None or escalated
+
+        if send:
+            state['alerted_at'] = now
+            state['severity'] = severity
+            state['level'] = signal['level']
+            self.sent += 1
+        else:
+            self.suppressed += 1
+        return send
+
+    def apply(self, result: Dict[str, Any], instrument: Optional[str] = None,
+              now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        用状态机过滤分析结果：只有新出现或升级的原因才提醒
+
+        Args:
+            result: 分析结果（含 alert_signals）
+            instrument: 品种代码，默认使用 result['product_name']
+
+        Returns:
+            原结果（原地更新 should_alert，alert_reasons 和 alert_level 只保留本次需要提醒的原因）
+        """
+        signals: List[Dict[str, Any]] = result.get('alert_signals') or []
+        if not signals:
+            return result
+
+        instrument = instrument or result.get('product_name', '')
+        sent = [signal for signal in signals if self.evaluate(instrument, signal, now)]
+        if result.get('should_alert') and not sent:
+            self.logger.info(f"{instrument} 提醒条件已于此前通知且未加深，本次不重复提醒")
+        result['should_alert'] = bool(sent)
+        result['alert_reasons'] = [signal['message'] for signal in sent]
+        result['alert_level'] = max((signal['level'] for signal in sent), key=LEVEL_RANK.get, default='none')
+        return result
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """读取状态文件"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取提醒状态失败: {e}")
+            return {}
+
+    def save(self, now: Optional[float] = None):
+        """原子写入状态文件（同时清理长时间未出现的状态）"""
+        if not self.path:
+            return
+        now = now if now is not None else time.time()
+        self.states = {
+            key: state for key, state in self.states.items()
+            if now - state.get('last_seen', now) < STATE_RETENTION_SECONDS
+        }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.states, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.warning(f"保存提醒状态失败: {e}")
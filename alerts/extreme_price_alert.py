@@ -2,26 +2,38 @@
 极值价格提醒模块 - 基于24小时极值的智能提醒系统
 """
 import logging
+from array import array
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from database.db_manager import DatabaseManager
+from alerts.rolling_extremes import RollingExtremes, to_epoch
+from alerts.alert_state import AlertStateMachine, alert_signal
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，未安装时逐段计算
+    np = None
 
 
 class ExtremePriceAlert:
     """极值价格提醒系统"""
 
-    def __init__(self, db: DatabaseManager, drop_threshold_percent: float = 5.0):
+    def __init__(self, db: DatabaseManager, drop_threshold_percent: float = 5.0,
+                 alert_state: Optional[AlertStateMachine] = None):
         """
         初始化极值价格提醒系统
 
         Args:
             db: 数据库管理器实例
             drop_threshold_percent: 下跌触发阈值（百分比），默认5%
+            alert_state: 提醒状态机，默认只在内存中记录（需要跨进程去重时传入带文件路径的实例）
         """
         self.db = db
         self.logger = logging.getLogger(__name__)
         self.drop_threshold_percent = drop_threshold_percent
-        self.alert_history = {}  # 存储提醒历史，避免重复提醒
+        # 存储提醒历史，避免重复提醒
+        self.alert_history = alert_state or AlertStateMachine(path=None, logger=self.logger)
+        self.windows: Dict[str, RollingExtremes] = {}  # 各品种的24小时滚动极值
 
     def get_24h_extremes(self, product_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -42,17 +54,14 @@ class ExtremePriceAlert:
             }
         """
         try:
-            # 获取过去24小时的数据
-            history = self.db.get_price_by_product(product_name, hours=24)
+            window = self._update_window(product_name)
 
-            if not history or len(history) == 0:
+            if len(window) == 0:
                 self.logger.warning(f"未找到 {product_name} 的24小时数据")
                 return None
 
-            prices = [record['price'] for record in history]
-
-            highest_price = max(prices)
-            lowest_price = min(prices)
+            highest_price = window.highest
+            lowest_price = window.lowest
             price_range = highest_price - lowest_price
 
             return {
@@ -60,7 +69,7 @@ class ExtremePriceAlert:
                 'highest_price_24h': round(highest_price, 2),
                 'lowest_price_24h': round(lowest_price, 2),
                 'price_range': round(price_range, 2),
-                'data_points': len(history),
+                'data_points': len(window),
                 'time_range': '24小时',
                 'timestamp': datetime.now().isoformat()
             }
@@ -69,6 +78,31 @@ class ExtremePriceAlert:
             self.logger.error(f"获取24小时极值失败: {str(e)}")
             return None
 
+    def _update_window(self, product_name: str) -> RollingExtremes:
+        """
+        增量更新品种的24小时滚动窗口
+
+        首次查询时加载整个窗口，之后只读取上次之后新增的记录
+        """
+        window = self.windows.get(product_name)
+        if window is None:
+            window = RollingExtremes(24 * 3600)
+            self.windows[product_name] = window
+
+        if window.last_timestamp is None:
+            rows = self.db.get_price_by_product(product_name, hours=24)
+        else:
+            rows = self.db.get_price_range(product_name, datetime.fromtimestamp(window.last_timestamp))
+
+        last_ts = window.last_timestamp
+        for row in rows:
+            ts = to_epoch(row['timestamp'])
+            if last_ts is None or ts > last_ts:
+                window.push(row['price'], ts)
+
+        window.evict()
+        return window
+
     def calculate_price_difference(self, current_price: float, highest_price_24h: float) -> Dict[str, Any]:
         """
         计算当前价格与24小时最高价的差值
@@ -168,10 +202,11 @@ class ExtremePriceAlert:
                 'extremes': extremes,
                 'price_diff': price_diff,
                 'alert_level': alert_level,
+                'alert_signals': self._alert_signals(current_price, extremes, price_diff),
                 'timestamp': datetime.now().isoformat()
             }
 
-            return result
+            return self.alert_history.apply(result)
 
         except Exception as e:
             self.logger.error(f"检查触发条件失败: {str(e)}")
@@ -185,6 +220,26 @@ class ExtremePriceAlert:
                 'alert_level': 'none'
             }
 
+    def _alert_signals(self, current_price: float, extremes: Dict[str, Any],
+                       price_diff: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        生成各触发条件的提醒信号，程度统一为距24小时最高价的跌幅（百分比）
+
+        最低价条件的触发线是24小时最低价对应的跌幅，提醒状态机据此判断何时解除和升级
+        """
+        highest = extremes['highest_price_24h']
+        percentage = price_diff['percentage_difference']
+        low_depth = round((highest - extremes['lowest_price_24h']) / highest * 100, 2) if highest else 0
+        return [
+            alert_signal('new_low', percentage, low_depth, 'high',
+                         f"当前价格 {current_price} 是24小时最低价",
+                         triggered=current_price <= extremes['lowest_price_24h']),
+            alert_signal('drop', percentage, self.drop_threshold_percent, 'medium',
+                         f"价格从24小时最高价 {highest} 下跌了 "
+                         f"{percentage}%（阈值: {self.drop_threshold_percent}%）",
+                         triggered=percentage >= self.drop_threshold_percent),
+        ]
+
     def set_drop_threshold(self, threshold_percent: float):
         """
         设置下跌触发阈值
@@ -207,6 +262,12 @@ class ExtremePriceAlert:
         """
         批量检查多个品种的提醒条件
 
+        一次查询取出所有品种的24小时数据，按品种连续存放在同一个数组中，
+        再一次性计算所有品种的极值、跌幅和提醒等级（安装了 numpy 时使用向量化计算）
+
+        run_once 不调用本方法：定时任务每次运行的数据库都是空的，各品种的提醒由 run_once.analyze_series
+        基于持久化的滚动窗口完成；本方法供保留数据库的调用方（常驻进程、脚本）按数据库中的历史检查
+
         Args:
             products: 品种名称列表
             current_prices: 品种名称到当前价格的映射
@@ -214,19 +275,132 @@ class ExtremePriceAlert:
         Returns:
             提醒结果列表
         """
-        results = []
-
+        checked = []
         for product in products:
             if product not in current_prices:
                 self.logger.warning(f"未找到 {product} 的当前价格")
                 continue
+            checked.append(product)
+
+        if not checked:
+            return []
 
+        try:
+            rows = self.db.get_prices_for_products(checked, hours=24)
+        except Exception as e:
+            self.logger.error(f"批量查询24小时数据失败: {str(e)}")
+            return [self.check_trigger_condition(product, current_prices[product]) for product in checked]
+
+        # 连续存放所有价格，记录每个品种的区间 [start, end)
+        prices = array('d')
+        segments: Dict[str, List[int]] = {}
+        for product_name, price in rows:
+            segment = segments.get(product_name)
+            if segment is None:
+                segment = segments[product_name] = [len(prices), len(prices)]
+            prices.append(price)
+            segment[1] = len(prices)
+
+        with_data = [product for product in checked if product in segments]
+        stats = self._compute_batch_stats(
+            prices,
+            [segments[product] for product in with_data],
+            array('d', (current_prices[product] for product in with_data))
+        )
+        stats_by_product = dict(zip(with_data, stats))
+
+        timestamp = datetime.now().isoformat()
+        results = []
+        for product in checked:
             current_price = current_prices[product]
-            result = self.check_trigger_condition(product, current_price)
-            results.append(result)
+            if product not in stats_by_product:
+                self.logger.warning(f"未找到 {product} 的24小时数据")
+                results.append({
+                    'product_name': product,
+                    'current_price': current_price,
+                    'should_alert': False,
+                    'alert_reasons': ['无法获取24小时数据'],
+                    'extremes': None,
+                    'price_diff': None,
+                    'alert_level': 'none'
+                })
+                continue
+
+            highest, lowest, count, percentage, is_lowest, is_drop = stats_by_product[product]
+            extremes = {
+                'product_name': product,
+                'highest_price_24h': round(highest, 2),
+                'lowest_price_24h': round(lowest, 2),
+                'price_range': round(highest - lowest, 2),
+                'data_points': count,
+                'time_range': '24小时',
+                'timestamp': timestamp
+            }
+            price_diff = self.calculate_price_difference(current_price, extremes['highest_price_24h'])
+
+            alert_reasons = []
+            if is_lowest:
+                alert_reasons.append(f"当前价格 {current_price} 是24小时最低价")
+            if is_drop:
+                alert_reasons.append(
+                    f"价格从24小时最高价 {extremes['highest_price_24h']} 下跌了 "
+                    f"{price_diff['percentage_difference']}%（阈值: {self.drop_threshold_percent}%）"
+                )
+
+            results.append(self.alert_history.apply({
+                'product_name': product,
+                'current_price': round(current_price, 2),
+                'should_alert': bool(alert_reasons),
+                'alert_reasons': alert_reasons,
+                'extremes': extremes,
+                'price_diff': price_diff,
+                'alert_level': 'high' if is_lowest else ('medium' if is_drop else 'none'),
+                'alert_signals': self._alert_signals(current_price, extremes, price_diff),
+                'timestamp': timestamp
+            }))
 
         return results
 
+    def _compute_batch_stats(self, prices: array, segments: List[List[int]],
+                             current: array) -> List[tuple]:
+        """
+        计算每个品种区间的 (最高价, 最低价, 数据点数, 跌幅%, 是否最低价, 是否超过跌幅阈值)
+
+        Args:
+            prices: 所有品种连续存放的价格数组
+            segments: 每个品种在数组中的区间 [start, end)
+            current: 各品种当前价格，顺序与 segments 一致
+        """
+        if not segments:
+            return []
+
+        threshold = self.drop_threshold_percent
+
+        if np is not None:
+            values = np.frombuffer(prices, dtype=np.float64)
+            starts = np.array([start for start, _ in segments], dtype=np.intp)
+            counts = np.array([end - start for start, end in segments], dtype=np.intp)
+            now = np.frombuffer(current, dtype=np.float64)
+
+            highs = np.maximum.reduceat(values, starts)
+            lows = np.minimum.reduceat(values, starts)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percentages = np.where(highs != 0, np.round((highs - now) / highs * 100, 2), 0.0)
+            is_lowest = now <= lows
+            is_drop = percentages >= threshold
+
+            return list(zip(highs.tolist(), lows.tolist(), counts.tolist(), percentages.tolist(),
+                            is_lowest.tolist(), is_drop.tolist()))
+
+        view = memoryview(prices)
+        stats = []
+        for (start, end), now in zip(segments, current):
+            window = view[start:end]
+            highest, lowest = max(window), min(window)
+            percentage = round((highest - now) / highest * 100, 2) if highest != 0 else 0.0
+            stats.append((highest, lowest, end - start, percentage, now <= lowest, percentage >= threshold))
+        return stats
+
     def get_alert_summary(self, alert_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         获取提醒摘要
@@ -0,0 +1,184 @@
+"""
+滚动窗口极值模块 - 基于单调队列的增量最高/最低价计算
+追加和查询均摊 O(1)，状态可持久化，供多次运行之间复用
+"""
+import os
+import json
+import time
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Union
+
+# 窗口状态可由历史记录重建，已加入 .gitignore，定时任务通过 Actions 缓存在运行之间保留
+ROLLING_EXTREMES_FILE = os.path.join('data', 'rolling_extremes.json')
+
+# 按品种保存的窗口状态（同样可由历史记录重建，不提交）
+SERIES_EXTREMES_FILE = os.path.join('data', 'series_extremes.json')
+
+TimeValue = Union[datetime, str, float, int, None]
+
+
+def to_epoch(value: TimeValue) -> float:
+    """将 datetime / ISO 字符串 / 时间戳统一转换为秒级时间戳"""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class RollingExtremes:
+    """
+    时间窗口内的滚动极值
+
+    三个队列都按时间递增：
+    - _samples: 窗口内所有样本（用于统计数据点数）
+    - _max: 价格单调递减，队首即窗口最高价
+    - _min: 价格单调递增，队首即窗口最低价
+    """
+
+    def __init__(self, window_seconds: float = 24 * 3600):
+        """
+        Args:
+            window_seconds: 窗口长度（秒），默认24小时
+        """
+        self.window_seconds = window_seconds
+        self._samples: deque = deque()
+        self._max: deque = deque()
+        self._min: deque = deque()
+
+    def push(self, price: float, timestamp: TimeValue = None):
+        """
+        追加一个样本（时间须不早于已有样本）
+
+        Args:
+            price: 价格
+            timestamp: 样本时间，默认为当前时间
+        """
+        ts = to_epoch(timestamp)
+        price = float(price)
+
+        self._samples.append((ts, price))
+        while self._max and self._max[-1][1] <= price:
+            self._max.pop()
+        self._max.append((ts, price))
+        while self._min and self._min[-1][1] >= price:
+            self._min.pop()
+        self._min.append((ts, price))
+
+        self.evict(ts)
+
+    def extend(self, samples: Iterable[tuple]):
+        """批量追加 (价格, 时间) 样本"""
+        for price, timestamp in samples:
+            self.push(price, timestamp)
+
+    def evict(self, now: TimeValue = None):
+        """移除窗口外的样本"""
+        cutoff = to_epoch(now) - self.window_seconds
+        for queue in (self._samples, self._max, self._min):
+            while queue and queue[0][0] < cutoff:
+                queue.popleft()
+
+    @property
+    def highest(self) -> Optional[float]:
+        """窗口内最高价"""
+        return self._max[0][1] if self._max else None
+
+    @property
+    def lowest(self) -> Optional[float]:
+        """窗口内最低价"""
+        return self._min[0][1] if self._min else None
+
+    @property
+    def last_price(self) -> Optional[float]:
+        """最新样本的价格"""
+        return self._samples[-1][1] if self._samples else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        """最新样本的时间戳"""
+        return self._samples[-1][0] if self._samples else None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'window_seconds': self.window_seconds,
+            'samples': list(self._samples),
+            'max': list(self._max),
+            'min': list(self._min),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RollingExtremes':
+        window = cls(data.get('window_seconds', 24 * 3600))
+        window._samples = deque(tuple(item) for item in data.get('samples', []))
+        window._max = deque(tuple(item) for item in data.get('max', []))
+        window._min = deque(tuple(item) for item in data.get('min', []))
+        return window
+
+    @classmethod
+    def load(cls, path: str = ROLLING_EXTREMES_FILE,
+             logger: Optional[logging.Logger] = None) -> Optional['RollingExtremes']:
+        """从文件加载窗口状态，文件不存在或损坏时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return cls.from_dict(json.load(f))
+        except Exception as e:
+            (logger or logging.getLogger(__name__)).warning(f"加载滚动极值状态失败: {e}")
+            return None
+
+    def save(self, path: str = ROLLING_EXTREMES_FILE, logger: Optional[logging.Logger] = None):
+        """原子写入窗口状态"""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            (logger or logging.getLogger(__name__)).warning(f"保存滚动极值状态失败: {e}")
+
+
+def load_series_windows(path: str = SERIES_EXTREMES_FILE,
+                        logger: Optional[logging.Logger] = None) -> Optional[Dict[str, RollingExtremes]]:
+    """
+    加载按品种保存的窗口状态
+
+    Returns:
+        {品种代码: RollingExtremes}，文件不存在或损坏时返回 None
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {instrument: RollingExtremes.from_dict(item) for instrument, item in data.items()}
+    except Exception as e:
+        (logger or logging.getLogger(__name__)).warning(f"加载品种极值状态失败: {e}")
+        return None
+
+
+def save_series_windows(windows: Dict[str, RollingExtremes], path: str = SERIES_EXTREMES_FILE,
+                        logger: Optional[logging.Logger] = None):
+    """原子写入所有品种的窗口状态（空窗口不保存）"""
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({instrument: window.to_dict() for instrument, window in windows.items() if len(window)},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        (logger or logging.getLogger(__name__)).warning(f"保存品种极值状态失败: {e}")
@@ -0,0 +1,92 @@
+"""
+银行 / 品牌别名注册表
+所有别名编译为一个正则交替表达式，任意名称一次匹配即可得到规范代码，新增银行无需增加判断分支
+"""
+import re
+from typing import Dict, Iterable, Optional
+
+from api.instrument_matcher import InstrumentMatcher
+
+# 银行代码 → 别名（名称中包含任一别名即视为该银行）
+BANK_ALIASES = {
+    'icbc': ['工商银行', '工行'],
+    'ccb': ['建设银行', '建行'],
+    'boc': ['中国银行', '中行'],
+    'abc': ['农业银行', '农行'],
+    'spdb': ['浦发银行', '浦发'],
+    'pingan': ['平安'],
+    'cmb': ['招商银行', '招行'],
+    'bocom': ['交通银行', '交行'],
+    'psbc': ['邮储', '邮政储蓄'],
+    'cib': ['兴业银行', '兴业'],
+    'citic': ['中信银行', '中信'],
+    'cmbc': ['民生银行', '民生'],
+    'ceb': ['光大银行', '光大'],
+    'hxb': ['华夏银行', '华夏'],
+}
+
+# 邮件中展示的关键银行
+KEY_BANKS = ('icbc', 'ccb', 'boc', 'abc', 'spdb', 'pingan')
+
+# 品牌金店代码 → 别名
+BRAND_ALIASES = {
+    'chowtaifook': ['周大福'],
+    'laofengxiang': ['老凤祥'],
+    'chowsangsang': ['周生生'],
+    'lukfook': ['六福'],
+    'chinagold': ['中国黄金'],
+    'caibai': ['菜百'],
+    'chjewellery': ['潮宏基'],
+    'jinzhizun': ['金至尊'],
+    'mingpai': ['明牌'],
+    'zhouliufu': ['周六福'],
+}
+
+
+class AliasRegistry:
+    """别名到规范代码的映射"""
+
+    def __init__(self, aliases: Dict[str, Iterable[str]]):
+        """
+        Args:
+            aliases: {规范代码: 别名列表}，规范代码须为合法标识符
+        """
+        self.aliases = {code: list(names) for code, names in aliases.items()}
+        self._compile()
+
+    def _compile(self):
+        # 同一代码的别名按长度降序排列，优先匹配完整名称
+        rules = [
+            (code, '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+            for code, names in self.aliases.items()
+        ]
+        self._matcher = InstrumentMatcher(rules)
+
+    def register(self, code: str, names: Iterable[str]):
+        """
+        新增或扩充别名
+
+        Args:
+            code: 规范代码
+            names: 别名列表
+        """
+        self.aliases.setdefault(code, []).extend(names)
+        self._compile()
+
+    def resolve(self, name: str) -> Optional[str]:
+        """返回名称对应的规范代码，未登记返回 None"""
+        return self._matcher.match(name or '')
+
+
+BANKS = AliasRegistry(BANK_ALIASES)
+BRANDS = AliasRegistry(BRAND_ALIASES)
+
+
+def resolve_bank(name: str) -> Optional[str]:
+    """银行名称 → 银行代码"""
+    return BANKS.resolve(name)
+
+
+def resolve_brand(name: str) -> Optional[str]:
+    """金店品牌名称 → 品牌代码"""
+    return BRANDS.resolve(name)
@@ -0,0 +1,141 @@
+"""
+美元兑人民币汇率缓存模块
+将最近一次成功获取的汇率保存到磁盘，过期后先返回旧值再在后台刷新（stale-while-revalidate）
+"""
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from typing import Dict, Any, Optional
+
+from api.http_session import get_session
+
+FX_RATE_URL = 'https://api.exchangerate-api.com/v4/latest/USD'
+FX_CACHE_FILE = os.path.join('data', 'fx_rate.json')
+
+# 无任何缓存且请求失败时的兜底汇率
+DEFAULT_CNY_RATE = 7.1
+
+
+class FxRateCache:
+    """USD→CNY 汇率缓存"""
+
+    def __init__(self, cache_path: str = FX_CACHE_FILE, ttl: float = 6 * 3600,
+                 max_stale: float = 7 * 24 * 3600,
+                 session: Optional[requests.Session] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化汇率缓存
+
+        Args:
+            cache_path: 缓存文件路径
+            ttl: 缓存新鲜期（秒），期内直接使用缓存
+            max_stale: 最长可接受的过期时间（秒），期内先返回旧值并后台刷新，超过则同步刷新
+            session: HTTP会话，默认使用共享会话
+            logger: 日志记录器
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.session = session or get_session()
+        self.logger = logger or logging.getLogger(__name__)
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def get_rate(self) -> float:
+        """
+        获取 USD→CNY 汇率
+
+        Returns:
+            汇率（1美元兑人民币）
+        """
+        entry = self._load()
+        age = time.time() - entry['fetched_at'] if entry else None
+
+        if entry and age < self.ttl:
+            return entry['rate']
+
+        if entry and age < self.max_stale:
+            self.logger.info(f"汇率缓存已过期 {int(age)}s，先使用缓存值 {entry['rate']} 并后台刷新")
+            self._refresh_in_background()
+            return entry['rate']
+
+        rate = self.refresh()
+        if rate is not None:
+            return rate
+
+        if entry:
+            self.logger.warning(f"汇率刷新失败，使用 {int(age)}s 前的缓存值: {entry['rate']}")
+            return entry['rate']
+
+        self.logger.warning(f"汇率获取失败且无缓存，使用默认汇率: {DEFAULT_CNY_RATE}")
+        return DEFAULT_CNY_RATE
+
+    def refresh(self) -> Optional[float]:
+        """同步请求最新汇率并写入缓存，失败返回 None"""
+        try:
+            resp = self.session.get(FX_RATE_URL, timeout=15)
+            if resp.status_code == 200:
+                rate = resp.json().get('rates', {}).get('CNY')
+                if rate:
+                    rate = float(rate)
+                    self._save({'rate': rate, 'fetched_at': time.time()})
+                    self.logger.info(f"汇率已更新: 1 USD = {rate} CNY")
+                    return rate
+            else:
+                self.logger.warning(f"汇率接口HTTP状态码异常: {resp.status_code}")
+        except Exception as e:
+            self.logger.warning(f"汇率请求失败: {e}")
+        return None
+
+    def wait_for_refresh(self, timeout: Optional[float] = None):
+        """等待后台刷新完成（如果有）"""
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+
+    def _refresh_in_background(self):
+        """启动后台刷新线程（守护线程，不会拖住进程退出；需要等待时调用 wait_for_refresh）"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self.refresh, name='fx-rate-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """读取缓存文件"""
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                entry = json.load(f)
+            if entry.get('rate') and entry.get('fetched_at'):
+                return entry
+        except Exception as e:
+            self.logger.warning(f"读取汇率缓存失败: {e}")
+        return None
+
+    def _save(self, entry: Dict[str, Any]):
+        """原子写入缓存文件"""
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            self.logger.warning(f"保存汇率缓存失败: {e}")
+
+
+_shared_cache: Optional[FxRateCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_fx_rate_cache(logger: Optional[logging.Logger] = None) -> FxRateCache:
+    """获取进程内共享的汇率缓存（同一时间最多一个后台刷新线程）"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = FxRateCache(logger=logger)
+        return _shared_cache
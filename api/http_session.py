@@ -0,0 +1,97 @@
+"""
+共享HTTP会话模块
+所有API客户端共用一个带连接池的 requests.Session，避免每次请求都重新建立 TCP/TLS 连接
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional
+
+# 连接池参数：每个主机保留的长连接数量、最多缓存的主机数量
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 6
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Connection': 'keep-alive',
+}
+
+_shared_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+
+def create_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> requests.Session:
+    """
+    创建带连接池的会话
+
+    Args:
+        pool_connections: 缓存连接池的主机数量
+        pool_maxsize: 每个主机的最大并发连接数（超出时排队等待，即单主机连接上限）
+
+    Returns:
+        配置好的 requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=True
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的会话（首次调用时创建）"""
+    global _shared_session
+    with _lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+
+def close_session():
+    """关闭共享会话，释放所有长连接"""
+    global _shared_session
+    with _lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
+
+
+def get_connection_stats(session: Optional[requests.Session] = None) -> Dict[str, Dict[str, int]]:
+    """
+    统计各主机的连接复用情况
+
+    Args:
+        session: 要统计的会话，默认为共享会话
+
+    Returns:
+        {主机: {'requests': 请求数, 'connections': 新建连接数, 'reused': 复用次数}}
+    """
+    session = session or _shared_session
+    if session is None:
+        return {}
+
+    stats = {}
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            entry = stats.setdefault(host, {'requests': 0, 'connections': 0, 'reused': 0})
+            entry['requests'] += pool.num_requests
+            entry['connections'] += pool.num_connections
+            entry['reused'] = entry['requests'] - entry['connections']
+
+    return stats
@@ -0,0 +1,47 @@
+"""
+品种匹配模块
+将关注的品种关键字预编译为一个正则表达式，一次遍历接口数据即可建立 品种 → 数据 的索引
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class InstrumentMatcher:
+    """预编译的品种匹配表"""
+
+    def __init__(self, rules: List[Tuple[str, str]], flags: int = 0):
+        """
+        Args:
+            rules: [(品种键, 正则表达式), ...]，品种键须为合法标识符
+            flags: 正则标志，如 re.IGNORECASE
+        """
+        self.keys = [key for key, _ in rules]
+        # 所有规则合并为一个带命名分组的交替表达式，每个名称只需扫描一次
+        self._regex = re.compile('|'.join(f'(?P<{key}>{pattern})' for key, pattern in rules), flags)
+
+    def match(self, text: str) -> Optional[str]:
+        """返回名称命中的品种键，未命中返回 None"""
+        m = self._regex.search(text)
+        return m.lastgroup if m else None
+
+    def index(self, items: Iterable[Any], field: str = 'variety') -> Dict[str, List[Dict[str, Any]]]:
+        """
+        一次遍历数据列表，建立品种键到候选数据的索引
+
+        同一品种的所有匹配行按原顺序保留，调用方依次尝试，某一行价格无效时可以改用下一行
+
+        Args:
+            items: 接口返回的数据列表
+            field: 品种名称所在字段
+
+        Returns:
+            {品种键: [数据, ...]}
+        """
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items or []:
+            if not isinstance(item, dict):
+                continue
+            key = self.match(str(item.get(field, '')))
+            if key:
+                found.setdefault(key, []).append(item)
+        return found
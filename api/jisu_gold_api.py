@@ -2,25 +2,57 @@
 极速数据API金价数据获取模块 - 完整版
 整合所有金价数据源，为用户提供最全面的金价信息
 """
+import re
 import requests
 import logging
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime
 
+from api.http_session import get_session
+from api.response_cache import ResponseCache, get_response_cache
+from api.quote import to_float, parse_jisu_spot, parse_jisu_london, parse_jisu_store
+from api.instrument_matcher import InstrumentMatcher
+
 
 class JisuGoldAPI:
     """极速数据黄金价格API封装"""
 
-    def __init__(self, appkey: str, logger: Optional[logging.Logger] = None):
+    # 各接口的缓存有效期（秒）：交易所行情变化快，银行和金店价格很少变动
+    CACHE_TTL = {
+        'shgold': 300,
+        'shfutures': 300,
+        'hkgold': 300,
+        'london': 300,
+        'bank': 1800,
+        'store': 3600,
+    }
+
+    # 各接口关注品种的匹配表，一次遍历即可定位
+    SGE_MATCHER = InstrumentMatcher([('au9999', '9999')])
+    LONDON_MATCHER = InstrumentMatcher([('london_gold', '伦敦|London')])
+    FUTURES_MATCHER = InstrumentMatcher([('futures_main', '主力|main')], re.IGNORECASE)
+
+    def __init__(self, appkey: str, logger: Optional[logging.Logger] = None,
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[ResponseCache] = None):
         self.appkey = appkey
         self.logger = logger or logging.getLogger(__name__)
+        self.session = session or get_session()
+        self.cache = cache or get_response_cache()
         self.base_url = 'https://api.jisuapi.com/gold'
 
     def _request(self, endpoint: str) -> Optional[Dict]:
         """统一的API请求方法"""
         try:
-            url = f'{self.base_url}/{endpoint}?appkey={self.appkey}'
-            resp = requests.get(url, timeout=15)
+            url = f'{self.base_url}/{endpoint}'
+            resp = self.cache.get(
+                self.session, url,
+                params={'appkey': self.appkey},
+                ttl=self.CACHE_TTL.get(endpoint, 0),
+                validate=lambda d: d.get('status') == 0,
+                timeout=15
+            )
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -93,10 +125,16 @@ class JisuGoldAPI:
             return result
         return None
 
-    def fetch_all_gold_prices(self) -> Dict[str, Any]:
+    def fetch_all_gold_prices(self, concurrent: bool = True, deadline: float = 20.0,
+                              on_result: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
         """
         获取所有金价数据
 
+        Args:
+            concurrent: 是否并发请求所有接口（默认开启），关闭时按顺序逐个请求
+            deadline: 并发模式下整批请求的总截止时间（秒），超时未返回的数据源记为 None
+            on_result: 可选回调，每个数据源返回时立即调用 on_result(数据源, 结果)
+
         Returns:
             包含所有数据源的字典
         """
@@ -104,24 +142,64 @@ class JisuGoldAPI:
         self.logger.info("开始获取所有金价数据...")
         self.logger.info("=" * 60)
 
-        all_data = {
-            'shanghai_gold': self.fetch_shanghai_gold(),
-            'shanghai_futures': self.fetch_shanghai_futures(),
-            'hongkong_gold': self.fetch_hongkong_gold(),
-            'bank_gold': self.fetch_bank_gold(),
-            'london_gold': self.fetch_london_gold(),
-            'store_gold': self.fetch_store_gold(),
-            'timestamp': datetime.now().isoformat()
+        fetchers = {
+            'shanghai_gold': self.fetch_shanghai_gold,
+            'shanghai_futures': self.fetch_shanghai_futures,
+            'hongkong_gold': self.fetch_hongkong_gold,
+            'bank_gold': self.fetch_bank_gold,
+            'london_gold': self.fetch_london_gold,
+            'store_gold': self.fetch_store_gold,
         }
 
+        if concurrent:
+            all_data = self._fetch_concurrently(fetchers, deadline, on_result)
+        else:
+            all_data = {}
+            for key, fetcher in fetchers.items():
+                all_data[key] = fetcher()
+                if on_result:
+                    on_result(key, all_data[key])
+
         # 统计成功获取的数据源
-        success_count = sum(1 for v in all_data.values() if v is not None and v != all_data['timestamp'])
+        success_count = sum(1 for v in all_data.values() if v is not None)
+        all_data['timestamp'] = datetime.now().isoformat()
+
         self.logger.info("=" * 60)
-        self.logger.info(f"数据获取完成: {success_count}/6 个数据源成功")
+        self.logger.info(f"数据获取完成: {success_count}/{len(fetchers)} 个数据源成功")
         self.logger.info("=" * 60)
 
         return all_data
 
+    def _fetch_concurrently(self, fetchers: Dict[str, Callable[[], Any]], deadline: float,
+                            on_result: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        并发请求所有数据源，总耗时约等于最慢的单个接口
+
+        超过总截止时间仍未返回的数据源不再等待，保留已完成的部分结果
+        """
+        results = {key: None for key in fetchers}
+        executor = ThreadPoolExecutor(max_workers=len(fetchers))
+        futures = {executor.submit(fetcher): key for key, fetcher in fetchers.items()}
+
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    self.logger.warning(f"{key} 获取异常: {e}")
+                    continue
+                if on_result:
+                    on_result(key, results[key])
+        except FuturesTimeoutError:
+            pending = [key for future, key in futures.items() if not future.done()]
+            self.logger.warning(f"已达到总截止时间 {deadline}s，放弃未完成的数据源: {', '.join(pending)}")
+        finally:
+            # 不等待仍在进行的请求，直接返回部分结果
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
     def get_key_prices(self) -> Dict[str, Any]:
         """
         获取关键金价数据（用于邮件提醒）
@@ -140,159 +218,85 @@ class JisuGoldAPI:
             'store_gold': []  # 金店金价（前3家）
         }
 
-        # 提取AU9999价格（使用第一条数据作为代表）
+        # 提取AU9999价格（未找到AU9999时使用第一条数据作为代表）
         if all_data['shanghai_gold'] and isinstance(all_data['shanghai_gold'], list) and len(all_data['shanghai_gold']) > 0:
-            # 优先查找AU9999
-            found = False
-            for item in all_data['shanghai_gold']:
-                if isinstance(item, dict):
-                    variety = str(item.get('variety', ''))
-                    if 'AU9999' in variety or 'Au9999' in variety or '9999' in variety:
-                        try:
-                            key_prices['au9999'] = {
-                                'name': item.get('variety', 'AU9999'),
-                                'price': float(item.get('latestpri', 0)),
-                                'open': float(item.get('openpri', 0)),
-                                'high': float(item.get('maxpri', 0)),
-                                'low': float(item.get('minpri', 0)),
-                                'update_time': item.get('time', '')
-                            }
-                            found = True
-                            self.logger.info(f"✓ 成功提取AU9999数据: {variety}")
-                            break
-                        except (ValueError, TypeError) as e:
-                            self.logger.warning(f"解析AU9999数据失败: {e}")
-                            continue
-
-            # 如果没找到AU9999，使用第一条数据
-            if not found and len(all_data['shanghai_gold']) > 0:
-                item = all_data['shanghai_gold'][0]
-                if isinstance(item, dict):
-                    try:
-                        key_prices['au9999'] = {
-                            'name': item.get('variety', '上海金'),
-                            'price': float(item.get('latestpri', 0)),
-                            'open': float(item.get('openpri', 0)),
-                            'high': float(item.get('maxpri', 0)),
-                            'low': float(item.get('minpri', 0)),
-                            'update_time': item.get('time', '')
-                        }
-                        self.logger.info(f"✓ 使用上海金第一条数据: {item.get('variety', '')}")
-                    except (ValueError, TypeError) as e:
-                        self.logger.warning(f"解析上海金数据失败: {e}")
+            self._extract(key_prices, 'au9999', all_data['shanghai_gold'], self.SGE_MATCHER,
+                          lambda item, name: parse_jisu_spot(item, 'sge.au9999', name), 'AU9999', '上海金')
 
         # 提取工商银行账户金
         if all_data['bank_gold'] and isinstance(all_data['bank_gold'], list):
             for item in all_data['bank_gold']:
                 if isinstance(item, dict) and item.get('typename') == '人民币账户黄金':
-                    try:
-                        key_prices['bank_gold'] = {
-                            'name': '工商银行账户金',
-                            'buy_price': float(item.get('buyprice', 0)),
-                            'sell_price': float(item.get('sellprice', 0)),
-                            'mid_price': float(item.get('midprice', 0)),
-                            'high': float(item.get('maxprice', 0)),
-                            'low': float(item.get('minprice', 0)),
-                            'update_time': item.get('updatetime', '')
-                        }
-                        break
-                    except (ValueError, TypeError) as e:
-                        self.logger.warning(f"解析工商银行数据失败: {e}")
+                    mid_price = to_float(item.get('midprice'))
+                    if mid_price is None:
+                        self.logger.warning(f"解析工商银行数据失败: {item.get('midprice')}")
                         continue
-
-        # 提取伦敦金价格（使用第一条数据）
+                    key_prices['bank_gold'] = {
+                        'name': '工商银行账户金',
+                        'buy_price': to_float(item.get('buyprice')),
+                        'sell_price': to_float(item.get('sellprice')),
+                        'mid_price': mid_price,
+                        'high': to_float(item.get('maxprice')),
+                        'low': to_float(item.get('minprice')),
+                        'update_time': item.get('updatetime', '')
+                    }
+                    break
+
+        # 提取伦敦金价格（未找到伦敦金时使用第一条数据）
         if all_data['london_gold'] and isinstance(all_data['london_gold'], list) and len(all_data['london_gold']) > 0:
-            # 优先查找伦敦金
-            found = False
-            for item in all_data['london_gold']:
-                if isinstance(item, dict):
-                    variety = str(item.get('variety', ''))
-                    if '伦敦金' in variety or 'London' in variety or '伦敦' in variety:
-                        try:
-                            key_prices['london_gold'] = {
-                                'name': item.get('variety', '伦敦金'),
-                                'price': float(item.get('price', 0)),
-                                'update_time': item.get('time', '')
-                            }
-                            found = True
-                            self.logger.info(f"✓ 成功提取伦敦金数据: {variety}")
-                            break
-                        except (ValueError, TypeError) as e:
-                            self.logger.warning(f"解析伦敦金数据失败: {e}")
-                            continue
-
-            # 如果没找到，使用第一条数据
-            if not found and len(all_data['london_gold']) > 0:
-                item = all_data['london_gold'][0]
-                if isinstance(item, dict):
-                    try:
-                        key_prices['london_gold'] = {
-                            'name': item.get('variety', '伦敦金'),
-                            'price': float(item.get('price', 0)),
-                            'update_time': item.get('time', '')
-                        }
-                        self.logger.info(f"✓ 使用伦敦金第一条数据: {item.get('variety', '')}")
-                    except (ValueError, TypeError) as e:
-                        self.logger.warning(f"解析伦敦金数据失败: {e}")
-
-        # 提取沪金主力合约（使用第一条数据）
+            self._extract(key_prices, 'london_gold', all_data['london_gold'], self.LONDON_MATCHER,
+                          lambda item, name: parse_jisu_london(item, default_name=name), '伦敦金', '伦敦金')
+
+        # 提取沪金主力合约（未找到主力合约时使用第一条数据）
         if all_data['shanghai_futures'] and isinstance(all_data['shanghai_futures'], list) and len(all_data['shanghai_futures']) > 0:
-            # 优先查找主力合约
-            found = False
-            for item in all_data['shanghai_futures']:
-                if isinstance(item, dict):
-                    variety = str(item.get('variety', ''))
-                    if '主力' in variety or 'main' in variety.lower():
-                        try:
-                            key_prices['futures_main'] = {
-                                'name': item.get('variety', '沪金主力'),
-                                'price': float(item.get('latestpri', 0)),
-                                'open': float(item.get('openpri', 0)),
-                                'high': float(item.get('maxpri', 0)),
-                                'low': float(item.get('minpri', 0)),
-                                'update_time': item.get('time', '')
-                            }
-                            found = True
-                            self.logger.info(f"✓ 成功提取期货主力数据: {variety}")
-                            break
-                        except (ValueError, TypeError) as e:
-                            self.logger.warning(f"解析期货数据失败: {e}")
-                            continue
-
-            # 如果没找到主力，使用第一条数据
-            if not found and len(all_data['shanghai_futures']) > 0:
-                item = all_data['shanghai_futures'][0]
-                if isinstance(item, dict):
-                    try:
-                        key_prices['futures_main'] = {
-                            'name': item.get('variety', '沪金期货'),
-                            'price': float(item.get('latestpri', 0)),
-                            'open': float(item.get('openpri', 0)),
-                            'high': float(item.get('maxpri', 0)),
-                            'low': float(item.get('minpri', 0)),
-                            'update_time': item.get('time', '')
-                        }
-                        self.logger.info(f"✓ 使用期货第一条数据: {item.get('variety', '')}")
-                    except (ValueError, TypeError) as e:
-                        self.logger.warning(f"解析期货数据失败: {e}")
+            self._extract(key_prices, 'futures_main', all_data['shanghai_futures'], self.FUTURES_MATCHER,
+                          lambda item, name: parse_jisu_spot(item, 'shfe.au_main', name), '沪金主力', '沪金期货')
 
         # 提取金店金价（前3家）
         if all_data['store_gold'] and isinstance(all_data['store_gold'], list):
             for item in all_data['store_gold'][:3]:
                 if isinstance(item, dict):
-                    try:
-                        key_prices['store_gold'].append({
-                            'name': item.get('name', ''),
-                            'price': float(item.get('price', 0)),
-                            'unit': item.get('unit', '元/克'),
-                            'update_time': item.get('time', '')
-                        })
-                    except (ValueError, TypeError) as e:
-                        self.logger.warning(f"解析金店数据失败: {e}")
+                    quote = parse_jisu_store(item)
+                    if quote is None:
+                        self.logger.warning(f"解析金店数据失败: {item.get('price')}")
                         continue
+                    store = quote.to_dict()
+                    store['unit'] = item.get('unit', '元/克')
+                    key_prices['store_gold'].append(store)
 
         return key_prices
 
+    def _extract(self, key_prices: Dict[str, Any], key: str, items: List[Dict], matcher: InstrumentMatcher,
+                 parse: Callable[[Dict, str], Any], name: str, fallback_name: str):
+        """
+        一次遍历数据列表提取指定品种（依次尝试所有匹配行），都无效时使用第一条数据
+
+        Args:
+            key_prices: 写入结果的字典
+            key: 品种键（与匹配表中的键一致）
+            items: 接口返回的数据列表
+            matcher: 品种匹配表
+            parse: 解析函数 (数据, 默认名称) -> Quote
+            name: 品种名称
+            fallback_name: 使用第一条数据时的默认名称
+        """
+        for item in matcher.index(items).get(key, []):
+            quote = parse(item, name)
+            if quote is not None:
+                key_prices[key] = quote.to_dict()
+                self.logger.info(f"✓ 成功提取{name}数据: {item.get('variety', '')}")
+                return
+            self.logger.warning(f"解析{name}数据失败: {item}")
+
+        item = items[0]
+        if isinstance(item, dict):
+            quote = parse(item, fallback_name)
+            if quote is None:
+                self.logger.warning(f"解析{fallback_name}数据失败: {item}")
+            else:
+                key_prices[key] = quote.to_dict()
+                self.logger.info(f"✓ 使用{fallback_name}第一条数据: {item.get('variety', '')}")
+
 
 # 使用示例
 if __name__ == '__main__':
@@ -7,14 +7,68 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+from api.http_session import get_session
+from api.response_cache import ResponseCache, get_response_cache
+from api.quota_budget import QuotaBudget
+from api.market_calendar import is_market_open
+from api.quote import parse_juhe_spot, parse_juhe_futures
+from api.instrument_matcher import InstrumentMatcher
+
 
 class JuheGoldAPI:
     """聚合数据黄金价格API封装"""
 
-    def __init__(self, api_key: str, logger: Optional[logging.Logger] = None):
+    # 配额统计中使用的数据源名称
+    PROVIDER = 'juhe'
+
+    # 各接口的缓存有效期（秒）
+    CACHE_TTL = {
+        'shgold': 300,
+        'shfutures': 300,
+    }
+
+    # 各接口对应的交易所，休市期间行情不变，直接使用最近一次快照
+    ENDPOINT_MARKET = {
+        'shgold': 'sge',
+        'shfutures': 'shfe',
+    }
+
+    # 开市期间跳过调用（调度器决定跳过或配额用完）时，可使用的缓存最长时长（秒），更旧的行情不再作为当前价格
+    MAX_STALE_OPEN = 1800
+
+    # 上海黄金交易所关注的品种：(键, 品种代码, 默认名称)
+    SGE_INSTRUMENTS = [
+        ('au9999', 'sge.au9999', 'Au99.99'),
+        ('au_td', 'sge.au_td', 'Au(T+D)'),
+    ]
+    SGE_MATCHER = InstrumentMatcher([
+        ('au9999', r'99\.99'),
+        ('au_td', r'T\+D'),
+    ])
+
+    def __init__(self, api_key: str, logger: Optional[logging.Logger] = None,
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[ResponseCache] = None,
+                 budget: Optional[QuotaBudget] = None,
+                 offline: bool = False):
+        """
+        Args:
+            api_key: 聚合数据API密钥
+            logger: 日志记录器
+            session: HTTP会话，默认使用共享会话
+            cache: 响应缓存，默认使用共享缓存
+            budget: 配额预算，设置后记录每次实际调用，配额用完时只使用缓存
+            offline: 只使用缓存数据，不发起网络请求（调度器决定本次跳过时使用）
+        """
         self.api_key = api_key
         self.logger = logger or logging.getLogger(__name__)
+        self.session = session or get_session()
+        self.cache = cache or get_response_cache()
+        self.budget = budget
+        self.offline = offline
         self.base_url = 'http://web.juhe.cn/finance/gold'
+        # 各接口最近一次结果的来源：{接口: {'from_cache', 'cache_age', 'stale'}}
+        self.cache_status: Dict[str, Dict[str, Any]] = {}
 
     def _request(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
         """统一的API请求方法"""
@@ -24,11 +78,49 @@ class JuheGoldAPI:
             if params:
                 request_params.update(params)
 
-            resp = requests.get(url, params=request_params, timeout=15)
-
-            if resp.status_code == 200:
+            offline = self.offline or (self.budget is not None and self.budget.remaining(self.PROVIDER) <= 0)
+            market = self.ENDPOINT_MARKET.get(endpoint)
+            market_closed = market is not None and not is_market_open(market)
+
+            ttl = self.CACHE_TTL.get(endpoint, 0)
+
+            def fetch(only_if_cached: bool):
+                return self.cache.get(
+                    self.session, url,
+                    params=request_params,
+                    ttl=ttl,
+                    validate=lambda d: d.get('resultcode') == '200',
+                    only_if_cached=only_if_cached,
+                    # 休市期间行情不变，快照不限时长；开市期间过旧的缓存不可用
+                    max_stale=None if market_closed else self.MAX_STALE_OPEN,
+                    timeout=15
+                )
+
+            resp = fetch(offline or market_closed)
+            if resp.status_code == 504 and market_closed and not offline:
+                # 休市但还没有快照，请求一次作为快照
+                resp = fetch(False)
+            if self.budget is not None and not resp.from_cache and resp.status_code != 504:
+                self.budget.record(self.PROVIDER)
+
+            # 开市期间超过有效期的缓存是过时行情，不能当作本次的新报价
+            self.cache_status[endpoint] = {
+                'from_cache': resp.from_cache,
+                'cache_age': round(resp.age),
+                'stale': resp.from_cache and not market_closed and resp.age >= ttl,
+            }
+
+            if resp.status_code == 504:
+                self.logger.warning(f"{endpoint} 本次不调用接口且无缓存数据")
+            elif resp.status_code == 200:
                 data = resp.json()
                 if data.get('resultcode') == '200':
+                    if market_closed and resp.from_cache:
+                        self.logger.info(f"{endpoint} 休市中，使用最近一次行情快照")
+                    elif self.cache_status[endpoint]['stale']:
+                        self.logger.info(f"{endpoint} 使用 {round(resp.age)} 秒前的缓存数据（过时行情）")
+                    elif resp.from_cache:
+                        self.logger.info(f"{endpoint} 使用缓存数据")
                     return data.get('result')
                 else:
                     error_code = data.get('error_code', 'unknown')
@@ -42,6 +134,13 @@ class JuheGoldAPI:
 
         return None
 
+    def _with_cache_status(self, data: Dict[str, Any], endpoint: str) -> Dict[str, Any]:
+        """行情来自缓存时附加 from_cache、cache_age、stale 字段"""
+        status = self.cache_status.get(endpoint)
+        if status and status['from_cache']:
+            data.update(status)
+        return data
+
     def fetch_shanghai_gold(self) -> Optional[List[Dict]]:
         """
         获取上海黄金交易所价格
@@ -152,53 +251,19 @@ class JuheGoldAPI:
             'futures_main': None,  # 沪金主力合约
         }
 
-        # 提取Au99.99价格
+        # 一次遍历上海黄金交易所数据，建立品种索引
         if all_data['shanghai_gold'] and isinstance(all_data['shanghai_gold'], list):
-            for item in all_data['shanghai_gold']:
-                if isinstance(item, dict):
-                    variety = str(item.get('variety', ''))
-                    # 查找Au99.99
-                    if 'Au99.99' in variety or 'AU99.99' in variety or '99.99' in variety:
-                        try:
-                            key_prices['au9999'] = {
-                                'name': item.get('variety', 'Au99.99'),
-                                'price': float(item.get('latestpri', 0)),
-                                'open': float(item.get('openpri', 0)),
-                                'high': float(item.get('maxpri', 0)),
-                                'low': float(item.get('minpri', 0)),
-                                'change': item.get('limit', '0%'),
-                                'yesterday': float(item.get('yespri', 0)),
-                                'volume': item.get('totalvol', '0'),
-                                'update_time': item.get('time', '')
-                            }
-                            self.logger.info(f"✓ 成功提取Au99.99数据: {variety} = {key_prices['au9999']['price']} 元/克")
-                            break
-                        except (ValueError, TypeError) as e:
-                            self.logger.warning(f"解析Au99.99数据失败: {e}")
-                            continue
-
-            # 查找Au(T+D)
-            for item in all_data['shanghai_gold']:
-                if isinstance(item, dict):
-                    variety = str(item.get('variety', ''))
-                    if 'Au(T+D)' in variety or 'AU(T+D)' in variety or 'T+D' in variety:
-                        try:
-                            key_prices['au_td'] = {
-                                'name': item.get('variety', 'Au(T+D)'),
-                                'price': float(item.get('latestpri', 0)),
-                                'open': float(item.get('openpri', 0)),
-                                'high': float(item.get('maxpri', 0)),
-                                'low': float(item.get('minpri', 0)),
-                                'change': item.get('limit', '0%'),
-                                'yesterday': float(item.get('yespri', 0)),
-                                'volume': item.get('totalvol', '0'),
-                                'update_time': item.get('time', '')
-                            }
-                            self.logger.info(f"✓ 成功提取Au(T+D)数据: {variety} = {key_prices['au_td']['price']} 元/克")
-                            break
-                        except (ValueError, TypeError) as e:
-                            self.logger.warning(f"解析Au(T+D)数据失败: {e}")
-                            continue
+            spot_index = self.SGE_MATCHER.index(all_data['shanghai_gold'])
+            for key, instrument, default_name in self.SGE_INSTRUMENTS:
+                # 依次尝试该品种的所有匹配行，价格无效时使用下一行
+                for item in spot_index.get(key, []):
+                    quote = parse_juhe_spot(item, instrument, default_name)
+                    if quote is None:
+                        self.logger.warning(f"解析{default_name}数据失败: {item.get('latestpri')}")
+                        continue
+                    key_prices[key] = self._with_cache_status(quote.to_dict(), 'shgold')
+                    self.logger.info(f"✓ 成功提取{default_name}数据: {quote.name} = {quote.price} 元/克")
+                    break
 
         # 提取沪金主力合约
         if all_data['shanghai_futures'] and isinstance(all_data['shanghai_futures'], list):
@@ -206,22 +271,12 @@ class JuheGoldAPI:
             if len(all_data['shanghai_futures']) > 0:
                 item = all_data['shanghai_futures'][0]
                 if isinstance(item, dict):
-                    try:
-                        # 期货接口返回的字段名称不同
-                        key_prices['futures_main'] = {
-                            'name': item.get('name', '沪金主力'),
-                            'price': float(item.get('latestpri', 0)),
-                            'open': float(item.get('open', 0)),
-                            'high': float(item.get('maxpri', 0)),
-                            'low': float(item.get('minpri', 0)),
-                            'change': item.get('change', '0'),
-                            'yesterday': float(item.get('lastclear', 0)),
-                            'volume': item.get('tradvol', '0'),
-                            'update_time': item.get('time', '')
-                        }
-                        self.logger.info(f"✓ 成功提取期货主力数据: {item.get('name', '')} = {key_prices['futures_main']['price']} 元/克")
-                    except (ValueError, TypeError) as e:
-                        self.logger.warning(f"解析期货数据失败: {e}")
+                    quote = parse_juhe_futures(item, 'shfe.au_main', '沪金主力')
+                    if quote is None:
+                        self.logger.warning(f"解析期货数据失败: {item.get('latestpri')}")
+                    else:
+                        key_prices['futures_main'] = self._with_cache_status(quote.to_dict(), 'shfutures')
+                        self.logger.info(f"✓ 成功提取期货主力数据: {quote.name} = {quote.price} 元/克")
 
         return key_prices
 
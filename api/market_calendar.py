@@ -0,0 +1,107 @@
+"""
+交易日历模块
+判断上海黄金交易所（SGE）和上海期货交易所（SHFE）当前是否处于交易时段（含夜盘、周末和法定节假日）
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+# 交易所均按北京时间交易
+CST = timezone(timedelta(hours=8))
+
+# 各交易所黄金品种交易时段（北京时间）
+# 夜盘跨越零点：从交易日晚上开始，到次日凌晨结束
+MARKET_SESSIONS = {
+    'sge': {
+        'day': [((9, 0), (11, 30)), ((13, 30), (15, 30))],
+        'night': ((20, 0), (2, 30)),
+    },
+    'shfe': {
+        'day': [((9, 0), (10, 15)), ((10, 30), (11, 30)), ((13, 30), (15, 0))],
+        'night': ((21, 0), (2, 30)),
+    },
+}
+
+# 法定节假日休市日期（不含周末）
+HOLIDAYS = {
+    # 2026年
+    date(2026, 1, 1), date(2026, 1, 2),
+    date(2026, 2, 16), date(2026, 2, 17), date(2026, 2, 18), date(2026, 2, 19),
+    date(2026, 2, 20), date(2026, 2, 23),
+    date(2026, 4, 6),
+    date(2026, 5, 1), date(2026, 5, 4), date(2026, 5, 5),
+    date(2026, 6, 19),
+    date(2026, 9, 25),
+    date(2026, 10, 1), date(2026, 10, 2), date(2026, 10, 5), date(2026, 10, 6), date(2026, 10, 7),
+}
+
+
+def add_holidays(dates: Iterable[str]):
+    """
+    追加休市日期
+
+    Args:
+        dates: 'YYYY-MM-DD' 格式的日期列表
+    """
+    for value in dates:
+        value = value.strip()
+        if value:
+            HOLIDAYS.add(datetime.strptime(value, '%Y-%m-%d').date())
+
+
+def is_trading_day(day: date) -> bool:
+    """判断是否为交易日（工作日且非节假日）"""
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+
+def next_trading_day(day: date) -> date:
+    """获取 day 之后的下一个交易日"""
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def has_night_session(day: date) -> bool:
+    """
+    判断交易日 day 晚上是否有夜盘
+
+    节假日前最后一个交易日不开夜盘，即下一个交易日必须紧接着（周五晚上接下周一）
+    """
+    if not is_trading_day(day):
+        return False
+    following = day + timedelta(days=3 if day.weekday() == 4 else 1)
+    return next_trading_day(day) == following
+
+
+def _minutes(hm) -> int:
+    return hm[0] * 60 + hm[1]
+
+
+def is_market_open(market: str = 'sge', now: Optional[datetime] = None) -> bool:
+    """
+    判断交易所当前是否开市
+
+    Args:
+        market: 交易所代码，'sge' 或 'shfe'
+        now: 待判断的时间，默认为当前时间（带时区的时间会换算为北京时间）
+
+    Returns:
+        是否处于交易时段
+    """
+    sessions = MARKET_SESSIONS[market]
+    now = now.astimezone(CST) if now and now.tzinfo else (now or datetime.now(CST))
+    today = now.date()
+    minutes = now.hour * 60 + now.minute
+
+    if is_trading_day(today):
+        for start, end in sessions['day']:
+            if _minutes(start) <= minutes < _minutes(end):
+                return True
+
+    night_start, night_end = sessions['night']
+    if minutes >= _minutes(night_start):
+        return has_night_session(today)
+    if minutes < _minutes(night_end):
+        return has_night_session(today - timedelta(days=1))
+
+    return False
@@ -0,0 +1,200 @@
+"""
+API配额预算模块
+按数据源、按天（北京时间）记录调用次数，并根据交易时段和价格波动自适应分配剩余配额
+"""
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from api.market_calendar import CST, is_market_open, is_trading_day
+
+# 调用计数每次运行都会变化，已加入 .gitignore，定时任务通过 Actions 缓存在运行之间保留
+QUOTA_STATE_FILE = os.path.join('data', 'api_quota.json')
+
+# 时段权重：权重越高，分配到的调用越密集
+SESSION_WEIGHT = 1.0      # 交易时段
+OFF_SESSION_WEIGHT = 0.25  # 工作日非交易时段（白天）
+QUIET_WEIGHT = 0.05       # 深夜、周末、节假日
+
+# 价格波动参考值（%）：波动达到该值时交易时段权重翻倍
+VOLATILITY_REFERENCE = 2.0
+
+# 权重为1时的最短轮询间隔（秒），低权重时段按比例拉长，即使配额充足也不频繁调用
+BASE_INTERVAL = 900
+
+# 计算剩余权重时间的步长（秒）
+SLOT_SECONDS = 300
+
+
+def session_weight(dt: datetime, volatility: float = 0.0) -> float:
+    """
+    计算某一时刻的调用权重
+
+    Args:
+        dt: 北京时间
+        volatility: 近期价格波动幅度（%）
+
+    Returns:
+        权重
+    """
+    if is_market_open('sge', dt):
+        return SESSION_WEIGHT * (1 + min(max(volatility, 0.0) / VOLATILITY_REFERENCE, 1.0))
+    if not is_trading_day(dt.date()) or dt.hour < 7 or dt.hour >= 23:
+        return QUIET_WEIGHT
+    return OFF_SESSION_WEIGHT
+
+
+class QuotaBudget:
+    """API配额预算与自适应调度"""
+
+    # 各数据源每日调用上限
+    DEFAULT_LIMITS = {
+        'juhe': 100,
+    }
+
+    def __init__(self, state_path: str = QUOTA_STATE_FILE, limits: Optional[Dict[str, int]] = None,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化配额预算
+
+        Args:
+            state_path: 状态文件路径（持久化各数据源当日已用次数）
+            limits: 各数据源每日调用上限，覆盖 DEFAULT_LIMITS
+            logger: 日志记录器
+        """
+        self.state_path = state_path
+        self.limits = dict(self.DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.state = self._load()
+
+    def used(self, provider: str, now: Optional[datetime] = None) -> int:
+        """获取数据源当日已用次数"""
+        entry = self.state.get(provider)
+        if not entry or entry.get('date') != self._today(now):
+            return 0
+        return entry.get('used', 0)
+
+    def remaining(self, provider: str, now: Optional[datetime] = None) -> int:
+        """获取数据源当日剩余次数（未设置上限的数据源视为不限）"""
+        limit = self.limits.get(provider)
+        if limit is None:
+            return 1 << 30
+        return max(limit - self.used(provider, now), 0)
+
+    def record(self, provider: str, count: int = 1, now: Optional[datetime] = None):
+        """
+        记录一次实际的网络调用
+
+        Args:
+            provider: 数据源名称
+            count: 调用次数
+            now: 调用时间（北京时间），默认为当前时间
+        """
+        now = now or datetime.now(CST)
+        with self._lock:
+            entry = self.state.get(provider)
+            if not entry or entry.get('date') != self._today(now):
+                entry = {'date': self._today(now), 'used': 0}
+                self.state[provider] = entry
+            entry['used'] += count
+            entry['last_poll'] = now.timestamp()
+            self._save()
+
+    def poll_interval(self, provider: str, cost: int = 1, volatility: float = 0.0,
+                      now: Optional[datetime] = None) -> Optional[float]:
+        """
+        计算当前时刻的目标轮询间隔
+
+        把剩余配额按权重分配到当天剩余时间：权重高的时段间隔短，权重低的时段间隔长，
+        且不低于 BASE_INTERVAL / 权重
+
+        Args:
+            provider: 数据源名称
+            cost: 每次轮询消耗的调用次数
+            volatility: 近期价格波动幅度（%）
+            now: 当前时间（北京时间）
+
+        Returns:
+            目标间隔（秒），配额已用完时返回 None
+        """
+        now = now or datetime.now(CST)
+        polls_left = self.remaining(provider, now) // max(cost, 1)
+        if polls_left <= 0:
+            return None
+
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        weighted_seconds = 0.0
+        slot = now
+        while slot < midnight:
+            step = min(SLOT_SECONDS, (midnight - slot).total_seconds())
+            weighted_seconds += session_weight(slot, volatility) * step
+            slot += timedelta(seconds=step)
+
+        weight = session_weight(now, volatility)
+        return max(weighted_seconds / polls_left / weight, BASE_INTERVAL / weight)
+
+    def should_poll(self, provider: str, cost: int = 1, volatility: float = 0.0,
+                    now: Optional[datetime] = None) -> bool:
+        """
+        判断本次是否应该调用数据源
+
+        Args:
+            provider: 数据源名称
+            cost: 每次轮询消耗的调用次数
+            volatility: 近期价格波动幅度（%）
+            now: 当前时间（北京时间）
+
+        Returns:
+            是否应该发起网络请求
+        """
+        now = now or datetime.now(CST)
+        interval = self.poll_interval(provider, cost, volatility, now)
+        if interval is None:
+            self.logger.warning(f"{provider} 今日配额已用完（{self.limits.get(provider)} 次）")
+            return False
+
+        entry = self.state.get(provider) or {}
+        elapsed = now.timestamp() - entry.get('last_poll', 0)
+        if elapsed >= interval:
+            return True
+
+        self.logger.info(
+            f"{provider} 距上次调用 {int(elapsed)}s，目标间隔 {int(interval)}s，"
+            f"本次跳过（今日剩余 {self.remaining(provider, now)} 次）"
+        )
+        return False
+
+    @staticmethod
+    def _today(now: Optional[datetime] = None) -> str:
+        """配额按北京时间自然日重置"""
+        return (now or datetime.now(CST)).astimezone(CST).strftime('%Y-%m-%d')
+
+    def _load(self) -> Dict[str, Any]:
+        """读取状态文件"""
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取配额状态失败: {e}")
+            return {}
+
+    def _save(self):
+        """原子写入状态文件（调用方需持有锁）"""
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            self.logger.warning(f"保存配额状态失败: {e}")
@@ -0,0 +1,180 @@
+"""
+标准化行情模块
+各数据源的返回数据统一转换为 Quote，每个数据源一个解析函数，一次完成字段映射和数值转换
+"""
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from api.bank_registry import resolve_bank, resolve_brand
+
+
+def to_float(value: Any) -> Optional[float]:
+    """将接口返回的数值（常为字符串）转换为 float，无效值返回 None"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+class Quote:
+    """
+    标准化行情
+
+    使用 __slots__ 存储，每条行情不再携带 __dict__，大量样本常驻内存时更省空间；
+    数值字段统一为 float（缺失为 None），历史记录和分析代码无需再做类型转换
+    """
+
+    __slots__ = ('instrument', 'name', 'price', 'open', 'high', 'low', 'volume',
+                 'timestamp', 'update_time', 'change', 'yesterday')
+
+    def __init__(self, instrument: str, name: str, price: float, open: Optional[float] = None,
+                 high: Optional[float] = None, low: Optional[float] = None,
+                 volume: Optional[float] = None, timestamp: Optional[float] = None,
+                 update_time: str = '', change: Optional[str] = None,
+                 yesterday: Optional[float] = None):
+        """
+        Args:
+            instrument: 品种代码，如 sge.au9999、shfe.au_main、bank.icbc
+            name: 数据源中的品种名称
+            price: 最新价
+            open: 开盘价
+            high: 最高价
+            low: 最低价
+            volume: 成交量
+            timestamp: 获取时间（秒级时间戳），默认为当前时间
+            update_time: 数据源给出的更新时间
+            change: 涨跌（数据源原样文本，如 '0.35%'）
+            yesterday: 昨收（或昨结算）价
+        """
+        self.instrument = instrument
+        self.name = name
+        self.price = price
+        self.open = open
+        self.high = high
+        self.low = low
+        self.volume = volume
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.update_time = update_time
+        self.change = change
+        self.yesterday = yesterday
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为邮件模板使用的字典格式（省略缺失字段）"""
+        data = {
+            'instrument': self.instrument,
+            'name': self.name,
+            'price': self.price,
+        }
+        for field in ('open', 'high', 'low', 'change', 'yesterday', 'volume'):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        data['update_time'] = self.update_time
+        return data
+
+    def __repr__(self) -> str:
+        return f"Quote({self.instrument}={self.price})"
+
+
+def _quote(instrument: str, name: str, price: Any, **fields) -> Optional[Quote]:
+    """价格无效时返回 None，其余数值字段逐个转换"""
+    price = to_float(price)
+    if price is None or price <= 0:
+        return None
+    for field in ('open', 'high', 'low', 'volume', 'yesterday'):
+        if field in fields:
+            fields[field] = to_float(fields[field])
+    # 成交量为整数时保持 int，邮件中显示 12345 而不是 12345.0
+    volume = fields.get('volume')
+    if volume is not None and volume.is_integer():
+        fields['volume'] = int(volume)
+    return Quote(instrument, name, price, **fields)
+
+
+def parse_juhe_spot(item: Dict[str, Any], instrument: str, default_name: str = '') -> Optional[Quote]:
+    """解析聚合数据上海黄金交易所行情"""
+    return _quote(
+        instrument, item.get('variety', default_name), item.get('latestpri'),
+        open=item.get('openpri'), high=item.get('maxpri'), low=item.get('minpri'),
+        volume=item.get('totalvol'), yesterday=item.get('yespri'),
+        change=item.get('limit', '0%'), update_time=item.get('time', '')
+    )
+
+
+def parse_juhe_futures(item: Dict[str, Any], instrument: str, default_name: str = '') -> Optional[Quote]:
+    """解析聚合数据上海期货交易所行情（字段名称与现货接口不同）"""
+    return _quote(
+        instrument, item.get('name', default_name), item.get('latestpri'),
+        open=item.get('open'), high=item.get('maxpri'), low=item.get('minpri'),
+        volume=item.get('tradvol'), yesterday=item.get('lastclear'),
+        change=item.get('change', '0'), update_time=item.get('time', '')
+    )
+
+
+def parse_jisu_spot(item: Dict[str, Any], instrument: str, default_name: str = '') -> Optional[Quote]:
+    """解析极速数据上海黄金 / 上海期货行情"""
+    return _quote(
+        instrument, item.get('variety', default_name), item.get('latestpri'),
+        open=item.get('openpri'), high=item.get('maxpri'), low=item.get('minpri'),
+        update_time=item.get('time', '')
+    )
+
+
+def parse_jisu_london(item: Dict[str, Any], instrument: str = 'london.gold',
+                      default_name: str = '伦敦金') -> Optional[Quote]:
+    """解析极速数据伦敦金行情"""
+    return _quote(instrument, item.get('variety', default_name), item.get('price'),
+                  update_time=item.get('time', ''))
+
+
+def parse_jisu_store(item: Dict[str, Any]) -> Optional[Quote]:
+    """解析极速数据金店金价"""
+    name = item.get('name', '')
+    return _quote(f"store.{name}", name, item.get('price'), update_time=item.get('time', ''))
+
+
+def parse_xiaoxiao_bank(item: Dict[str, Any], instrument: Optional[str] = None) -> Optional[Quote]:
+    """
+    解析小小API银行金条价格
+
+    Args:
+        item: 接口返回的单条数据
+        instrument: 品种代码，默认按银行别名表解析为 bank.<银行代码>，未登记的银行使用名称
+    """
+    name = item.get('bank', '')
+    return _quote(instrument or f"bank.{resolve_bank(name) or name}", name, item.get('price'))
+
+
+def parse_xiaoxiao_store(item: Dict[str, Any]) -> Optional[Quote]:
+    """解析小小API品牌金店价格（取黄金价，品种代码按品牌别名表解析）"""
+    brand = item.get('brand', '')
+    return _quote(f"store.{resolve_brand(brand) or brand}", brand, item.get('gold_price'),
+                  update_time=item.get('updated_date', ''))
+
+
+def parse_xiaoxiao_recycle(item: Dict[str, Any]) -> Optional[Quote]:
+    """解析小小API黄金回收价格"""
+    gold_type = item.get('gold_type', '')
+    return _quote(f"recycle.{gold_type}", gold_type, item.get('recycle_price'),
+                  update_time=item.get('updated_date', ''))
+
+
+def parse_xiaoxiao_payload(data: Optional[Dict[str, Any]]) -> List[Quote]:
+    """
+    一次遍历小小API的全部数据，转换为行情列表
+
+    Args:
+        data: 小小API返回的 data 字段
+
+    Returns:
+        有效行情列表
+    """
+    data = data or {}
+    quotes: Iterable[Optional[Quote]] = [
+        *(parse_xiaoxiao_bank(item) for item in data.get('bank_gold_bar_price', [])),
+        *(parse_xiaoxiao_store(item) for item in data.get('precious_metal_price', [])),
+        *(parse_xiaoxiao_recycle(item) for item in data.get('gold_recycle_price', [])),
+    ]
+    return [quote for quote in quotes if quote is not None and quote.name]
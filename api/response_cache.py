@@ -0,0 +1,158 @@
+"""
+HTTP响应缓存模块
+按接口地址和参数缓存API返回的JSON，支持按接口设置有效期，并在上游支持时使用 ETag / Last-Modified 条件请求
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import requests
+from typing import Any, Callable, Dict, Optional
+
+# 缓存文件每次运行都会变化，已加入 .gitignore，定时任务通过 Actions 缓存在运行之间保留
+RESPONSE_CACHE_FILE = os.path.join('data', 'http_cache.json')
+
+
+class CachedResponse:
+    """与 requests.Response 用法一致的精简响应对象"""
+
+    def __init__(self, status_code: int, data: Any = None, from_cache: bool = False, age: float = 0.0):
+        self.status_code = status_code
+        self.data = data
+        self.from_cache = from_cache
+        self.age = age  # 缓存数据距上次从接口获取的时长（秒）
+
+    def json(self) -> Any:
+        return self.data
+
+
+class ResponseCache:
+    """磁盘持久化的JSON响应缓存"""
+
+    def __init__(self, cache_path: str = RESPONSE_CACHE_FILE, logger: Optional[logging.Logger] = None):
+        """
+        初始化响应缓存
+
+        Args:
+            cache_path: 缓存文件路径
+            logger: 日志记录器
+        """
+        self.cache_path = cache_path
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        """
+        生成缓存键
+
+        参数中可能包含API密钥，因此只保存哈希值，缓存文件中不含密钥
+        """
+        raw = url + '?' + '&'.join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, session: requests.Session, url: str, params: Optional[Dict] = None,
+            ttl: float = 0, validate: Optional[Callable[[Any], bool]] = None,
+            only_if_cached: bool = False, max_stale: Optional[float] = None, **kwargs) -> CachedResponse:
+        """
+        带缓存的GET请求
+
+        Args:
+            session: HTTP会话
+            url: 请求地址
+            params: 查询参数
+            ttl: 缓存有效期（秒），期内直接返回缓存不发请求
+            validate: 判断返回数据是否有效的函数，只有有效数据才会写入缓存
+            only_if_cached: 只使用缓存（不论是否过期），不发网络请求；无缓存时返回 504
+            max_stale: only_if_cached 时可接受的最长缓存时长（秒），超过视为无缓存，None 表示不限
+            **kwargs: 透传给 session.get 的参数（timeout、verify 等）
+
+        Returns:
+            CachedResponse，from_cache 表示数据来自缓存（包括 304 未修改）
+        """
+        key = self.make_key(url, params)
+        with self._lock:
+            entry = self.entries.get(key)
+
+        age = time.time() - entry['stored_at'] if entry else 0.0
+        if entry and only_if_cached and max_stale is not None and age > max_stale:
+            self.logger.info(f"{url} 缓存已超过 {max_stale:.0f} 秒，不再使用")
+            entry = None
+
+        if entry and (only_if_cached or age < ttl):
+            return CachedResponse(200, entry['data'], from_cache=True, age=age)
+
+        if only_if_cached:
+            return CachedResponse(504)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        resp = session.get(url, params=params, headers=headers, **kwargs)
+
+        if resp.status_code == 304 and entry:
+            with self._lock:
+                entry['stored_at'] = time.time()
+                self._save()
+            self.logger.debug(f"{url} 未修改，使用缓存")
+            return CachedResponse(200, entry['data'], from_cache=True)
+
+        if resp.status_code != 200:
+            return CachedResponse(resp.status_code)
+
+        data = resp.json()
+        if validate is None or validate(data):
+            with self._lock:
+                self.entries[key] = {
+                    'data': data,
+                    'stored_at': time.time(),
+                    'etag': resp.headers.get('ETag'),
+                    'last_modified': resp.headers.get('Last-Modified'),
+                }
+                self._save()
+
+        return CachedResponse(200, data)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """读取缓存文件"""
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取响应缓存失败: {e}")
+            return {}
+
+    def _save(self):
+        """原子写入缓存文件（调用方需持有锁）"""
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            self.logger.warning(f"保存响应缓存失败: {e}")
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取进程内共享的响应缓存（所有客户端共用，避免相互覆盖缓存文件）"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
@@ -7,12 +7,24 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+from api.http_session import get_session
+from api.response_cache import ResponseCache, get_response_cache
+from api.quote import parse_xiaoxiao_bank
+from api.bank_registry import KEY_BANKS, resolve_bank
+
 
 class XiaoxiaoGoldAPI:
     """小小API黄金价格封装 - 完全免费"""
 
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    # 缓存有效期（秒）：银行金条、金店和回收价格很少变动
+    CACHE_TTL = 3600
+
+    def __init__(self, logger: Optional[logging.Logger] = None,
+                 session: Optional[requests.Session] = None,
+                 cache: Optional[ResponseCache] = None):
         self.logger = logger or logging.getLogger(__name__)
+        self.session = session or get_session()
+        self.cache = cache or get_response_cache()
         self.base_url = 'https://v2.xxapi.cn/api/goldprice'
 
     def fetch_all_gold_prices(self) -> Optional[Dict[str, Any]]:
@@ -28,8 +40,11 @@ class XiaoxiaoGoldAPI:
             }
 
             # 禁用SSL验证，添加重试
-            resp = requests.get(
+            resp = self.cache.get(
+                self.session,
                 self.base_url,
+                ttl=self.CACHE_TTL,
+                validate=lambda d: d.get('code') == 200,
                 headers=headers,
                 timeout=15,
                 verify=False  # 禁用SSL验证
@@ -45,7 +60,7 @@ class XiaoxiaoGoldAPI:
                     recycle_count = len(result.get('gold_recycle_price', []))
                     brand_count = len(result.get('precious_metal_price', []))
 
-                    self.logger.info(f"✓ 小小API: 获取成功")
+                    self.logger.info(f"✓ 小小API: 获取成功{'（缓存）' if resp.from_cache else ''}")
                     self.logger.info(f"  - 银行金条: {bank_count} 家")
                     self.logger.info(f"  - 回收价格: {recycle_count} 种")
                     self.logger.info(f"  - 品牌金店: {brand_count} 家")
@@ -104,68 +119,32 @@ class XiaoxiaoGoldAPI:
         Returns:
             精简的关键银行数据
         """
-        bank_prices = self.get_bank_gold_prices()
+        return self.extract_key_bank_prices(self.get_bank_gold_prices())
+
+    def extract_key_bank_prices(self, bank_prices: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        从银行金条列表中提取关键银行金价（银行名称按别名表一次匹配）
 
-        key_banks = {
-            'icbc': None,  # 工商银行
-            'ccb': None,   # 建设银行
-            'boc': None,   # 中国银行
-            'abc': None,   # 农业银行
-            'spdb': None,  # 浦发银行
-            'pingan': None # 平安银行
-        }
+        Args:
+            bank_prices: 接口返回的银行金条列表
+
+        Returns:
+            {银行代码: 金价}，未获取到的银行为 None
+        """
+        key_banks = dict.fromkeys(KEY_BANKS)
 
         for item in bank_prices:
             bank_name = item.get('bank', '')
-            price = float(item.get('price', 0))
-
-            if '工商银行' in bank_name or '工行' in bank_name:
-                key_banks['icbc'] = {
-                    'name': bank_name,
-                    'price': price,
-                    'type': '投资金条'
-                }
-                self.logger.info(f"✓ 工商银行金条: {price} 元/克")
-
-            elif '建设银行' in bank_name or '建行' in bank_name:
-                key_banks['ccb'] = {
-                    'name': bank_name,
-                    'price': price,
-                    'type': '投资金条'
-                }
-                self.logger.info(f"✓ 建设银行金条: {price} 元/克")
-
-            elif '中国银行' in bank_name or '中行' in bank_name:
-                key_banks['boc'] = {
-                    'name': bank_name,
-                    'price': price,
-                    'type': '投资金条'
-                }
-                self.logger.info(f"✓ 中国银行金条: {price} 元/克")
-
-            elif '农业银行' in bank_name or '农行' in bank_name:
-                key_banks['abc'] = {
-                    'name': bank_name,
-                    'price': price,
-                    'type': '投资金条'
-                }
-                self.logger.info(f"✓ 农业银行金条: {price} 元/克")
-
-            elif '浦发银行' in bank_name or '浦发' in bank_name:
-                key_banks['spdb'] = {
-                    'name': bank_name,
-                    'price': price,
-                    'type': '投资金条'
-                }
-                self.logger.info(f"✓ 浦发银行金条: {price} 元/克")
-
-            elif '平安' in bank_name:
-                key_banks['pingan'] = {
-                    'name': bank_name,
-                    'price': price,
-                    'type': '投资金条'
-                }
-                self.logger.info(f"✓ 平安银行金条: {price} 元/克")
+            code = resolve_bank(bank_name)
+            if code not in key_banks:
+                continue
+
+            quote = parse_xiaoxiao_bank(item, f"bank.{code}")
+            if quote is None:
+                self.logger.warning(f"解析{bank_name}金条价格失败: {item.get('price')}")
+                continue
+            key_banks[code] = {**quote.to_dict(), 'type': '投资金条'}
+            self.logger.info(f"✓ {bank_name}金条: {quote.price} 元/克")
 
         return key_banks
 
@@ -71,11 +71,15 @@ class ConfigLoader:
             'RECIPIENT_EMAILS', 'DROP_THRESHOLD_PERCENT',
             'ENABLE_EMAIL_NOTIFICATION', 'TEST_MODE',
             'DATABASE_PATH', 'LOG_LEVEL', 'LOG_FILE',
-            'JUHE_API_KEY'
+            'JUHE_API_KEY', 'FALLBACK_SOURCES', 'FALLBACK_HEDGE_DELAY',
+            'JUHE_DAILY_QUOTA', 'ADAPTIVE_POLLING', 'MARKET_HOLIDAYS',
+            'POLL_INTERVAL', 'CHECKPOINT_INTERVAL', 'SMTP_MAX_MESSAGES_PER_CONNECTION',
+            'ALERT_COOLDOWN_MINUTES', 'ALERT_HYSTERESIS_PERCENT', 'ALERT_ESCALATION_STEP_PERCENT'
         ]
         for key in env_keys:
             value = os.environ.get(key)
-            if value is not None:
+            # GitHub Actions 中未设置的密钥会以空字符串传入，此时沿用默认值
+            if value:
                 self.config[key] = value
 
     def get(self, key: str, default: Any = None) -> Any:
@@ -91,12 +95,13 @@ class ConfigLoader:
         """
         return self.config.get(key, default)
 
-    def get_email_config(self) -> Dict[str, str]:
+    def get_email_config(self) -> Dict[str, Any]:
         """获取邮件配置"""
         return {
             'email_type': self.get('EMAIL_TYPE', 'qq'),
             'email_address': self.get('EMAIL_ADDRESS', ''),
             'app_password': self.get('APP_PASSWORD', ''),
+            'max_messages_per_connection': int(self.get('SMTP_MAX_MESSAGES_PER_CONNECTION', '50')),
         }
 
     def get_recipient_emails(self) -> list:
@@ -112,6 +117,31 @@ class ConfigLoader:
             'drop_threshold_percent': float(self.get('DROP_THRESHOLD_PERCENT', '5.0')),
             'enable_email_notification': self.get('ENABLE_EMAIL_NOTIFICATION', 'true').lower() == 'true',
             'test_mode': self.get('TEST_MODE', 'false').lower() == 'true',
+            'cooldown_minutes': float(self.get('ALERT_COOLDOWN_MINUTES', '360')),
+            'hysteresis_percent': float(self.get('ALERT_HYSTERESIS_PERCENT', '0.5')),
+            'escalation_step_percent': float(self.get('ALERT_ESCALATION_STEP_PERCENT', '1.0')),
+        }
+
+    def get_fallback_config(self) -> Dict[str, Any]:
+        """获取备用数据源配置"""
+        sources_str = self.get('FALLBACK_SOURCES', '')
+        return {
+            'sources': [name.strip() for name in sources_str.split(',') if name.strip()] or None,
+            'hedge_delay': float(self.get('FALLBACK_HEDGE_DELAY', '2.0')),
+        }
+
+    def get_quota_config(self) -> Dict[str, Any]:
+        """获取API配额配置"""
+        return {
+            'juhe_daily_quota': int(self.get('JUHE_DAILY_QUOTA', '100')),
+            'adaptive_polling': self.get('ADAPTIVE_POLLING', 'true').lower() == 'true',
+        }
+
+    def get_daemon_config(self) -> Dict[str, float]:
+        """获取常驻模式配置"""
+        return {
+            'poll_interval': float(self.get('POLL_INTERVAL', '1800')),
+            'checkpoint_interval': float(self.get('CHECKPOINT_INTERVAL', '600')),
         }
 
     def get_database_config(self) -> Dict[str, str]:
@@ -133,6 +163,9 @@ class ConfigLoader:
             'email': self.get_email_config(),
             'recipients': self.get_recipient_emails(),
             'alert': self.get_alert_config(),
+            'fallback': self.get_fallback_config(),
+            'quota': self.get_quota_config(),
+            'daemon': self.get_daemon_config(),
             'database': self.get_database_config(),
             'log': self.get_log_config(),
         }
@@ -0,0 +1,7 @@
+"""
+数据存储模块初始化文件
+"""
+from .history_store import HistoryStore
+from .db_manager import DatabaseManager
+
+__all__ = ['HistoryStore', 'DatabaseManager']
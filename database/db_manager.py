@@ -0,0 +1,205 @@
+"""
+数据库管理模块 - 基于 SQLite 的多品种价格存储
+使用 WAL 模式、批量写入和 (品种, 时间) 复合索引，支持按时间范围快速查询
+"""
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+TimeValue = Union[datetime, str, None]
+
+
+class DatabaseManager:
+    """价格数据库管理器"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_name TEXT NOT NULL,
+            price REAL NOT NULL,
+            source TEXT,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_prices_product_time ON prices (product_name, timestamp);
+    """
+
+    def __init__(self, db_path: str = 'gold_prices.db', logger: Optional[logging.Logger] = None):
+        """
+        初始化数据库管理器
+
+        Args:
+            db_path: 数据库文件路径（对应配置项 DATABASE_PATH）
+            logger: 日志记录器
+        """
+        self.db_path = db_path
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _format_time(value: TimeValue) -> str:
+        """统一时间格式（本地时间、秒级 ISO 格式），保证字符串比较与时间顺序一致"""
+        if value is None:
+            value = datetime.now()
+        elif isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is not None:
+            # 带时区的时间先换算为本地时间，再去掉时区
+            value = value.astimezone().replace(tzinfo=None)
+        return value.isoformat(timespec='seconds')
+
+    def insert_price(self, product_name: str, price: float, source: Optional[str] = None,
+                     timestamp: TimeValue = None):
+        """
+        写入一条价格记录
+
+        Args:
+            product_name: 品种名称
+            price: 价格
+            source: 数据来源
+            timestamp: 时间，默认为当前时间
+        """
+        self.insert_prices([{
+            'product_name': product_name,
+            'price': price,
+            'source': source,
+            'timestamp': timestamp,
+        }])
+
+    def insert_prices(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        在一个事务中批量写入价格记录
+
+        Args:
+            records: 记录列表，每条包含 product_name、price，可选 source、timestamp
+
+        Returns:
+            写入的记录数
+        """
+        rows = [
+            (
+                record['product_name'],
+                float(record['price']),
+                record.get('source'),
+                self._format_time(record.get('timestamp')),
+            )
+            for record in records
+        ]
+        if not rows:
+            return 0
+
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO prices (product_name, price, source, timestamp) VALUES (?, ?, ?, ?)',
+                rows
+            )
+        self.logger.debug(f"已写入 {len(rows)} 条价格记录")
+        return len(rows)
+
+    def get_price_range(self, product_name: str, start: TimeValue,
+                        end: TimeValue = None) -> List[Dict[str, Any]]:
+        """
+        查询品种在时间范围内的价格（走复合索引）
+
+        Args:
+            product_name: 品种名称
+            start: 开始时间（包含）
+            end: 结束时间（包含），默认为当前时间
+
+        Returns:
+            按时间升序排列的记录列表
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                'SELECT product_name, price, source, timestamp FROM prices '
+                'WHERE product_name = ? AND timestamp >= ? AND timestamp <= ? '
+                'ORDER BY timestamp',
+                (product_name, self._format_time(start), self._format_time(end))
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_price_by_product(self, product_name: str, hours: float = 24) -> List[Dict[str, Any]]:
+        """
+        查询品种最近若干小时的价格
+
+        Args:
+            product_name: 品种名称
+            hours: 时间窗口（小时）
+
+        Returns:
+            按时间升序排列的记录列表
+        """
+        return self.get_price_range(product_name, datetime.now() - timedelta(hours=hours))
+
+    def get_prices_for_products(self, product_names: List[str], hours: float = 24) -> List[tuple]:
+        """
+        一次查询多个品种最近若干小时的价格
+
+        Args:
+            product_names: 品种名称列表
+            hours: 时间窗口（小时）
+
+        Returns:
+            按品种、时间排序的 (品种名称, 价格) 元组列表，同一品种的记录连续排列
+        """
+        if not product_names:
+            return []
+
+        placeholders = ','.join('?' * len(product_names))
+        cutoff = self._format_time(datetime.now() - timedelta(hours=hours))
+        with self._lock:
+            cursor = self.conn.execute(
+                f'SELECT product_name, price FROM prices '
+                f'WHERE product_name IN ({placeholders}) AND timestamp >= ? '
+                f'ORDER BY product_name, timestamp',
+                (*product_names, cutoff)
+            )
+            return cursor.fetchall()
+
+    def get_latest_price(self, product_name: str) -> Optional[Dict[str, Any]]:
+        """获取品种最新一条价格记录"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT product_name, price, source, timestamp FROM prices '
+                'WHERE product_name = ? ORDER BY timestamp DESC LIMIT 1',
+                (product_name,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_products(self) -> List[str]:
+        """获取所有已记录的品种名称"""
+        with self._lock:
+            cursor = self.conn.execute('SELECT DISTINCT product_name FROM prices ORDER BY product_name')
+            return [row[0] for row in cursor.fetchall()]
+
+    def delete_before(self, cutoff: TimeValue) -> int:
+        """
+        删除早于指定时间的记录（用于控制数据保留期）
+
+        Args:
+            cutoff: 截止时间
+
+        Returns:
+            删除的记录数
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute('DELETE FROM prices WHERE timestamp < ?', (self._format_time(cutoff),))
+        return cursor.rowcount
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
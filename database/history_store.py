@@ -0,0 +1,229 @@
+"""
+历史价格存储模块 - 追加写入的 JSON Lines 文件
+每次运行只追加一行，按时间长度（而非条数）保留记录，过期行累积到一定数量时才整体压缩一次
+每行除主价格外还可包含 series 字段：本次获取的全部品种行情 {品种代码: 价格}
+"""
+import os
+import json
+import logging
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+PRICE_HISTORY_FILE = 'price_history.jsonl'
+
+# 旧版整体重写的历史文件，首次加载时自动迁移
+LEGACY_HISTORY_FILE = 'price_history.json'
+
+# 常用分析窗口（秒）
+WINDOWS = {
+    '1h': 3600,
+    '24h': 24 * 3600,
+    '7d': 7 * 24 * 3600,
+}
+
+
+def _record_time(record: Dict[str, Any]) -> float:
+    """记录的时间戳（秒）"""
+    return datetime.fromisoformat(record['timestamp']).timestamp()
+
+
+class HistoryStore:
+    """按时间索引、追加写入的历史价格存储"""
+
+    def __init__(self, path: str = PRICE_HISTORY_FILE, retention_seconds: float = WINDOWS['7d'],
+                 min_compact_lines: int = 48, legacy_path: Optional[str] = LEGACY_HISTORY_FILE,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化历史价格存储
+
+        Args:
+            path: JSON Lines 文件路径
+            retention_seconds: 记录保留时长（秒），默认7天
+            min_compact_lines: 过期行数至少达到该值且不少于有效行数时才压缩文件
+            legacy_path: 旧版 JSON 历史文件路径，存在时迁移到新格式
+            logger: 日志记录器
+        """
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.min_compact_lines = min_compact_lines
+        self.legacy_path = legacy_path
+        self.logger = logger or logging.getLogger(__name__)
+        self.records: List[Dict[str, Any]] = []
+        self._times: List[float] = []  # 与 records 一一对应的时间戳，用于二分查找
+        self.line_count = 0
+
+    def load(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        加载保留期内的历史记录
+
+        Args:
+            now: 当前时间戳，默认为当前时间
+
+        Returns:
+            按时间顺序排列的记录列表
+        """
+        self.records = []
+        self._times = []
+        self.line_count = 0
+
+        if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+            self._migrate_legacy()
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        self.line_count += 1
+                        try:
+                            record = json.loads(line)
+                            ts = _record_time(record)
+                        except (ValueError, KeyError):
+                            self.logger.warning(f"跳过损坏的历史记录: {line[:50]}")
+                            continue
+                        self.records.append(record)
+                        self._times.append(ts)
+            except Exception as e:
+                self.logger.warning(f"加载历史价格失败: {e}")
+
+        self._expire(now)
+        return list(self.records)
+
+    def append(self, record: Dict[str, Any]):
+        """
+        追加一条记录（时间须不早于已有记录）
+
+        Args:
+            record: 价格记录
+        """
+        try:
+            ts = _record_time(record)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.records.append(record)
+            self._times.append(ts)
+            self.line_count += 1
+            self.logger.info(f"已追加历史价格记录（文件共 {self.line_count} 行）")
+        except Exception as e:
+            self.logger.error(f"保存历史价格失败: {e}")
+            return
+
+        self._expire(ts)
+        expired_lines = self.line_count - len(self.records)
+        if expired_lines >= max(len(self.records), self.min_compact_lines):
+            self.compact()
+
+    def window(self, seconds: float, now: Optional[float] = None,
+               include_frozen: bool = True) -> List[Dict[str, Any]]:
+        """
+        获取最近一段时间内的记录（二分查找起点）
+
+        Args:
+            seconds: 时间窗口长度（秒）
+            now: 窗口结束时间戳，默认为当前时间
+            include_frozen: 是否包含休市期间的冻结报价和开市期间的过时缓存行情
+
+        Returns:
+            按时间顺序排列的记录列表
+        """
+        now = now if now is not None else datetime.now().timestamp()
+        start = bisect_left(self._times, now - seconds)
+        records = self.records[start:]
+        if not include_frozen:
+            records = [record for record in records if not record.get('frozen') and not record.get('stale')]
+        return records
+
+    def series_samples(self, seconds: float, now: Optional[float] = None) -> Dict[str, List[tuple]]:
+        """
+        按品种拆分最近一段时间内的行情（来自记录中的 series 字段，不含冻结和过时行情）
+
+        Args:
+            seconds: 时间窗口长度（秒）
+            now: 窗口结束时间戳，默认为当前时间
+
+        Returns:
+            {品种代码: [(价格, 时间戳), ...]}，按时间顺序排列
+        """
+        now = now if now is not None else datetime.now().timestamp()
+        start = bisect_left(self._times, now - seconds)
+        samples: Dict[str, List[tuple]] = {}
+        for record, ts in zip(self.records[start:], self._times[start:]):
+            frozen = set(record.get('frozen_series', [])) | set(record.get('stale_series', []))
+            for instrument, price in record.get('series', {}).items():
+                if instrument not in frozen:
+                    samples.setdefault(instrument, []).append((price, ts))
+        return samples
+
+    def summarize_windows(self, windows: Optional[Dict[str, float]] = None,
+                          now: Optional[float] = None,
+                          rolling: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        汇总多个时间窗口的价格概况（不含冻结报价）
+
+        传入增量维护的滚动窗口时直接读取其极值，只有没有对应滚动窗口的时间窗口才扫描历史记录
+
+        Args:
+            windows: {名称: 秒数}，默认为 WINDOWS
+            now: 当前时间戳
+            rolling: {名称: RollingExtremes}，与 windows 同名的滚动窗口
+
+        Returns:
+            {名称: {'data_points', 'highest', 'lowest'}}
+        """
+        summary = {}
+        for name, seconds in (windows or WINDOWS).items():
+            window = (rolling or {}).get(name)
+            if window is not None:
+                window.evict(now)
+                summary[name] = {
+                    'data_points': len(window),
+                    'highest': window.highest,
+                    'lowest': window.lowest,
+                }
+                continue
+            prices = [record['price'] for record in self.window(seconds, now, include_frozen=False)]
+            summary[name] = {
+                'data_points': len(prices),
+                'highest': max(prices) if prices else None,
+                'lowest': min(prices) if prices else None,
+            }
+        return summary
+
+    def compact(self):
+        """压缩文件，只保留保留期内的记录"""
+        try:
+            self._write_all(self.records)
+            self.line_count = len(self.records)
+            self.logger.info(f"历史价格文件已压缩，保留 {self.line_count} 条记录")
+        except Exception as e:
+            self.logger.error(f"压缩历史价格文件失败: {e}")
+
+    def _expire(self, now: Optional[float] = None):
+        """从内存中移除保留期之前的记录"""
+        now = now if now is not None else datetime.now().timestamp()
+        start = bisect_left(self._times, now - self.retention_seconds)
+        if start:
+            del self.records[:start]
+            del self._times[:start]
+
+    def _write_all(self, records):
+        """原子重写整个文件"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def _migrate_legacy(self):
+        """将旧版 JSON 列表文件转换为 JSON Lines 并删除旧文件"""
+        try:
+            with open(self.legacy_path, 'r') as f:
+                legacy = json.load(f)
+            self._write_all(legacy)
+            os.remove(self.legacy_path)
+            self.logger.info(f"已将 {self.legacy_path} 迁移为 {self.path}（{len(legacy)} 条记录）")
+        except Exception as e:
+            self.logger.warning(f"迁移旧版历史文件失败: {e}")
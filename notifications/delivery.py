@@ -0,0 +1,94 @@
+"""
+邮件投递模块 - 多个SMTP连接并发投递
+收件人分配给有限数量的工作线程，每个线程持有一个已认证的连接
+
+临时错误（4xx、DATA 之前的连接中断）由 SmtpSession 按抖动退避重试；
+DATA 开始后连接中断无法确认是否已送达，不在此处重试，由发件箱按退避策略处理
+"""
+import queue
+import smtplib
+import logging
+import threading
+from email.message import Message
+from typing import Callable, Dict, List, Optional
+
+from notifications.smtp_session import SmtpSession
+
+
+class DeliveryEngine:
+    """有界并发的邮件投递器"""
+
+    def __init__(self, session_factory: Callable[[], SmtpSession], workers: int = 1,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化投递器
+
+        Args:
+            session_factory: 创建SMTP会话的函数，每个工作线程调用一次
+            workers: 最大并发连接数（应不超过邮箱服务商允许的并发数）
+            logger: 日志记录器
+        """
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.logger = logger or logging.getLogger(__name__)
+        self.connections = 0
+
+    def deliver(self, recipient_emails: List[str],
+                build_message: Callable[[str], Message]) -> Dict[str, bool]:
+        """
+        投递邮件
+
+        认证失败时立即停止所有工作线程，剩余收件人全部记为失败，不再用错误的凭据反复登录
+
+        Args:
+            recipient_emails: 收件人邮箱列表
+            build_message: 根据收件人生成邮件的函数
+
+        Returns:
+            发送结果字典 {邮箱: 是否成功}，顺序与收件人列表一致
+        """
+        pending: queue.Queue = queue.Queue()
+        for email in recipient_emails:
+            pending.put(email)
+
+        results: Dict[str, bool] = {}
+        lock = threading.Lock()
+        aborted = threading.Event()
+
+        def worker():
+            with self.session_factory() as smtp:
+                while not aborted.is_set():
+                    try:
+                        email = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    ok = self._send(smtp, build_message, email, aborted)
+                    with lock:
+                        results[email] = ok
+                with lock:
+                    self.connections += smtp.connections
+
+        count = min(self.workers, len(recipient_emails))
+        threads = [threading.Thread(target=worker, name=f'smtp-worker-{i}') for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {email: results.get(email, False) for email in recipient_emails}
+
+    def _send(self, smtp: SmtpSession, build_message: Callable[[str], Message], recipient_email: str,
+              aborted: threading.Event) -> bool:
+        """发送单封邮件，认证失败时设置 aborted 通知其他工作线程停止"""
+        try:
+            smtp.send(build_message(recipient_email), recipient_email)
+            self.logger.info(f"✓ 邮件已发送到: {recipient_email}")
+            return True
+        except smtplib.SMTPAuthenticationError:
+            if not aborted.is_set():
+                aborted.set()
+                self.logger.error("✗ 邮件发送失败: 邮箱认证失败，请检查邮箱地址和应用授权码，停止本批发送")
+            return False
+        except Exception as e:
+            self.logger.error(f"✗ 邮件发送失败 ({recipient_email}): {e}")
+            return False
@@ -9,6 +9,9 @@ from email.header import Header
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from notifications.smtp_session import SmtpSession, DEFAULT_MAX_MESSAGES_PER_CONNECTION
+from notifications.delivery import DeliveryEngine
+
 
 class EmailNotifier:
     """邮件通知器"""
@@ -18,16 +21,20 @@ class EmailNotifier:
         'qq': {
             'smtp_server': 'smtp.qq.com',
             'smtp_port': 587,
-            'description': 'QQ邮箱'
+            'description': 'QQ邮箱',
+            'max_connections': 2  # 同一账号允许的并发连接数
         },
         '163': {
             'smtp_server': 'smtp.163.com',
             'smtp_port': 587,
-            'description': '163邮箱'
+            'description': '163邮箱',
+            'max_connections': 3
         }
     }
 
-    def __init__(self, email_address: str, app_password: str, email_type: str = 'qq'):
+    def __init__(self, email_address: str, app_password: str, email_type: str = 'qq',
+                 max_messages_per_connection: int = DEFAULT_MAX_MESSAGES_PER_CONNECTION,
+                 max_connections: Optional[int] = None):
         """
         初始化邮件通知器
 
@@ -35,10 +42,14 @@ class EmailNotifier:
             email_address: 邮箱地址
             app_password: 应用授权码（不是邮箱密码）
             email_type: 邮箱类型 ('qq' 或 '163')
+            max_messages_per_connection: 批量发送时单个连接最多发送的邮件数
+            max_connections: 批量发送的并发连接数，不超过邮箱服务商的上限
         """
         self.email_address = email_address
         self.app_password = app_password
         self.email_type = email_type.lower()
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_connections = max_connections
         self.logger = logging.getLogger(__name__)
 
         # 验证邮箱类型
@@ -61,16 +72,7 @@ class EmailNotifier:
         try:
             # 生成邮件内容
             subject, html_content = self._generate_email_content(alert_result)
-
-            # 创建邮件
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = Header(subject, 'utf-8')
-            msg['From'] = self.email_address
-            msg['To'] = recipient_email
-            msg['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0800')
-
-            # 添加HTML内容
-            msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+            msg = self._build_message(recipient_email, subject, MIMEText(html_content, 'html', 'utf-8'))
 
             # 发送邮件
             self._send_smtp(msg, recipient_email)
@@ -93,12 +95,35 @@ class EmailNotifier:
         Returns:
             发送结果字典 {邮箱: 是否成功}
         """
-        results = {}
-
-        for email in recipient_emails:
-            results[email] = self.send_alert_email(email, alert_result)
+        # 邮件内容对所有收件人相同，只生成一次；MIME 对象在投递线程中序列化，每封邮件单独创建
+        subject, html_content = self._generate_email_content(alert_result)
+
+        engine = DeliveryEngine(
+            self.open_session,
+            workers=min(self.smtp_config['max_connections'], self.max_connections or len(recipient_emails)),
+            logger=self.logger
+        )
+        return engine.deliver(
+            recipient_emails,
+            lambda email: self._build_message(email, subject, MIMEText(html_content, 'html', 'utf-8'))
+        )
+
+    def _build_message(self, recipient_email: str, subject: str, body: MIMEText) -> MIMEMultipart:
+        """
+        创建邮件
 
-        return results
+        Args:
+            recipient_email: 收件人邮箱
+            subject: 邮件主题
+            body: HTML正文
+        """
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = Header(subject, 'utf-8')
+        msg['From'] = self.email_address
+        msg['To'] = recipient_email
+        msg['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0800')
+        msg.attach(body)
+        return msg
 
     def _generate_email_content(self, alert_result: Dict[str, Any]) -> tuple:
         """
@@ -312,26 +337,9 @@ class EmailNotifier:
             recipient_email: 收件人邮箱
         """
         try:
-            # 连接SMTP服务器
-            server = smtplib.SMTP(
-                self.smtp_config['smtp_server'],
-                self.smtp_config['smtp_port'],
-                timeout=10
-            )
-
-            # 启用TLS加密
-            server.starttls()
-
-            # 登录
-            server.login(self.email_address, self.app_password)
-
-            # 发送邮件
-            server.send_message(msg, from_addr=self.email_address, to_addrs=recipient_email)
-
-            # 关闭连接
-            server.quit()
-
-            self.logger.debug(f"SMTP连接已关闭")
+            # 连接、加密、登录、发送后关闭连接
+            with self.open_session() as session:
+                session.send(msg, recipient_email)
 
         except smtplib.SMTPAuthenticationError:
             raise Exception("邮箱认证失败，请检查邮箱地址和应用授权码")
@@ -340,6 +348,17 @@ class EmailNotifier:
         except Exception as e:
             raise Exception(f"邮件发送错误: {str(e)}")
 
+    def open_session(self) -> SmtpSession:
+        """创建可复用的SMTP会话（首次发送时才连接）"""
+        return SmtpSession(
+            self.smtp_config['smtp_server'],
+            self.smtp_config['smtp_port'],
+            self.email_address,
+            self.app_password,
+            max_messages_per_connection=self.max_messages_per_connection,
+            logger=self.logger
+        )
+
     def test_connection(self) -> bool:
         """
         测试邮件连接
@@ -2,14 +2,181 @@
 增强版邮件通知模块 - 整合所有金价数据源
 为用户提供最全面的金价信息
 """
+import json
 import smtplib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
 from email.header import Header
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from notifications.smtp_session import SmtpSession, DEFAULT_MAX_MESSAGES_PER_CONNECTION
+from notifications.delivery import DeliveryEngine
+
+
+# 邮件样式（所有邮件相同，作为常量只定义一次）
+EMAIL_CSS = """
+    body {
+        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+        background-color: #f5f5f5;
+        margin: 0;
+        padding: 20px;
+    }
+    .container {
+        max-width: 800px;
+        margin: 0 auto;
+        background-color: white;
+        border-radius: 8px;
+        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+        overflow: hidden;
+    }
+    .header {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        padding: 30px;
+        text-align: center;
+    }
+    .header h1 {
+        margin: 0;
+        font-size: 28px;
+        font-weight: bold;
+    }
+    .alert-level {
+        display: inline-block;
+        background-color: rgba(255,255,255,0.3);
+        padding: 5px 15px;
+        border-radius: 20px;
+        font-size: 14px;
+        margin-top: 10px;
+    }
+    .content {
+        padding: 30px;
+    }
+    .section {
+        margin-bottom: 30px;
+    }
+    .section-title {
+        font-size: 20px;
+        font-weight: bold;
+        color: #333;
+        margin-bottom: 15px;
+        padding-bottom: 10px;
+        border-bottom: 2px solid #667eea;
+    }
+    .price-card {
+        background-color: #f9f9f9;
+        border-left: 4px solid #667eea;
+        padding: 15px;
+        margin-bottom: 15px;
+        border-radius: 4px;
+    }
+    .price-row {
+        display: flex;
+        justify-content: space-between;
+        padding: 8px 0;
+        border-bottom: 1px solid #eee;
+    }
+    .price-row:last-child {
+        border-bottom: none;
+    }
+    .label {
+        font-weight: bold;
+        color: #666;
+    }
+    .value {
+        color: #667eea;
+        font-weight: bold;
+        font-size: 16px;
+    }
+    .highlight {
+        background-color: #fff3cd;
+        padding: 2px 6px;
+        border-radius: 3px;
+    }
+    .table {
+        width: 100%;
+        border-collapse: collapse;
+        margin-top: 10px;
+    }
+    .table th {
+        background-color: #f0f0f0;
+        padding: 10px;
+        text-align: left;
+        border-bottom: 2px solid #667eea;
+        font-weight: bold;
+    }
+    .table td {
+        padding: 10px;
+        border-bottom: 1px solid #eee;
+    }
+    .reasons {
+        background-color: #f0f7ff;
+        border-left: 4px solid #0066cc;
+        padding: 15px;
+        margin-top: 20px;
+        border-radius: 4px;
+    }
+    .reasons h3 {
+        margin-top: 0;
+        color: #0066cc;
+    }
+    .reason-item {
+        margin: 8px 0;
+        color: #333;
+        padding-left: 20px;
+        position: relative;
+    }
+    .reason-item:before {
+        content: "✓";
+        position: absolute;
+        left: 0;
+        color: #0066cc;
+        font-weight: bold;
+    }
+    .footer {
+        background-color: #f5f5f5;
+        padding: 20px;
+        text-align: center;
+        font-size: 12px;
+        color: #999;
+        border-top: 1px solid #eee;
+    }
+    .tip {
+        background-color: #e8f5e9;
+        border-left: 4px solid #4caf50;
+        padding: 15px;
+        margin-top: 20px;
+        border-radius: 4px;
+        font-size: 13px;
+        color: #2e7d32;
+    }
+"""
+
+
+class RenderedEmail:
+    """渲染好的邮件内容，同一次提醒的所有收件人共用"""
+
+    __slots__ = ('subject', 'html', 'body_payload')
+
+    def __init__(self, subject: str, html: str):
+        self.subject = Header(subject, 'utf-8').encode()
+        self.html = html
+        # 正文只编码一次，缓存编码后的内容
+        self.body_payload = MIMEText(html, 'html', 'utf-8').get_payload()
+
+    def body_part(self) -> MIMENonMultipart:
+        """
+        生成正文 MIME 部分
+
+        每封邮件使用独立的对象（序列化时可能修改信头和内容，多个投递线程不能共用），只复用编码结果
+        """
+        part = MIMENonMultipart('text', 'html', charset='utf-8')
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.set_payload(self.body_payload)
+        return part
+
 
 class EnhancedEmailNotifier:
     """增强版邮件通知器 - 支持多数据源金价展示"""
@@ -19,49 +186,52 @@ class EnhancedEmailNotifier:
         'qq': {
             'smtp_server': 'smtp.qq.com',
             'smtp_port': 587,
-            'description': 'QQ邮箱'
+            'description': 'QQ邮箱',
+            'max_connections': 2  # 同一账号允许的并发连接数
         },
         '163': {
             'smtp_server': 'smtp.163.com',
             'smtp_port': 587,
-            'description': '163邮箱'
+            'description': '163邮箱',
+            'max_connections': 3
         }
     }
 
-    def __init__(self, email_address: str, app_password: str, email_type: str = 'qq'):
+    def __init__(self, email_address: str, app_password: str, email_type: str = 'qq',
+                 max_messages_per_connection: int = DEFAULT_MAX_MESSAGES_PER_CONNECTION,
+                 max_connections: Optional[int] = None):
         self.email_address = email_address
         self.app_password = app_password
         self.email_type = email_type.lower()
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_connections = max_connections
         self.logger = logging.getLogger(__name__)
+        self._rendered: Optional[tuple] = None  # (内容指纹, RenderedEmail)，只缓存最近一次提醒
 
         if self.email_type not in self.SMTP_CONFIG:
             raise ValueError(f"不支持的邮箱类型: {email_type}")
 
         self.smtp_config = self.SMTP_CONFIG[self.email_type]
 
-    def send_comprehensive_alert(self, recipient_email: str, alert_data: Dict[str, Any]) -> bool:
+    def send_comprehensive_alert(self, recipient_email: str, alert_data: Dict[str, Any],
+                                 smtp: Optional[SmtpSession] = None,
+                                 rendered: Optional[RenderedEmail] = None) -> bool:
         """
         发送综合金价提醒邮件
 
         Args:
             recipient_email: 收件人邮箱
             alert_data: 包含所有金价数据的字典
+            smtp: 复用的SMTP会话，为空时单独建立连接
+            rendered: 已渲染的邮件内容，为空时按 alert_data 渲染（相同内容会命中缓存）
 
         Returns:
             是否发送成功
         """
         try:
-            subject, html_content = self._generate_comprehensive_email(alert_data)
+            msg = self._build_message(rendered or self.render_email(alert_data), recipient_email)
 
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = Header(subject, 'utf-8')
-            msg['From'] = self.email_address
-            msg['To'] = recipient_email
-            msg['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0800')
-
-            msg.attach(MIMEText(html_content, 'html', 'utf-8'))
-
-            self._send_smtp(msg, recipient_email)
+            self._send_smtp(msg, recipient_email, smtp)
 
             self.logger.info(f"✓ 综合金价邮件已发送到: {recipient_email}")
             return True
@@ -70,6 +240,32 @@ class EnhancedEmailNotifier:
             self.logger.error(f"✗ 邮件发送失败: {str(e)}")
             return False
 
+    def render_email(self, alert_data: Dict[str, Any]) -> RenderedEmail:
+        """
+        渲染邮件内容（同一提醒只渲染一次）
+
+        Args:
+            alert_data: 包含所有金价数据的字典
+
+        Returns:
+            RenderedEmail
+        """
+        fingerprint = json.dumps(alert_data, sort_keys=True, ensure_ascii=False, default=str)
+        if self._rendered is None or self._rendered[0] != fingerprint:
+            subject, html_content = self._generate_comprehensive_email(alert_data)
+            self._rendered = (fingerprint, RenderedEmail(subject, html_content))
+        return self._rendered[1]
+
+    def _build_message(self, rendered: RenderedEmail, recipient_email: str) -> MIMEMultipart:
+        """组装单个收件人的邮件：只设置收件人相关的信头，正文复用已编码的内容"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = rendered.subject
+        msg['From'] = self.email_address
+        msg['To'] = recipient_email
+        msg['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0800')
+        msg.attach(rendered.body_part())
+        return msg
+
     def _generate_comprehensive_email(self, alert_data: Dict[str, Any]) -> tuple:
         """
         生成综合金价邮件内容
@@ -92,140 +288,7 @@ class EnhancedEmailNotifier:
             <head>
                 <meta charset="UTF-8">
                 <style>
-                    body {{
-                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                        background-color: #f5f5f5;
-                        margin: 0;
-                        padding: 20px;
-                    }}
-                    .container {{
-                        max-width: 800px;
-                        margin: 0 auto;
-                        background-color: white;
-                        border-radius: 8px;
-                        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                        overflow: hidden;
-                    }}
-                    .header {{
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white;
-                        padding: 30px;
-                        text-align: center;
-                    }}
-                    .header h1 {{
-                        margin: 0;
-                        font-size: 28px;
-                        font-weight: bold;
-                    }}
-                    .alert-level {{
-                        display: inline-block;
-                        background-color: rgba(255,255,255,0.3);
-                        padding: 5px 15px;
-                        border-radius: 20px;
-                        font-size: 14px;
-                        margin-top: 10px;
-                    }}
-                    .content {{
-                        padding: 30px;
-                    }}
-                    .section {{
-                        margin-bottom: 30px;
-                    }}
-                    .section-title {{
-                        font-size: 20px;
-                        font-weight: bold;
-                        color: #333;
-                        margin-bottom: 15px;
-                        padding-bottom: 10px;
-                        border-bottom: 2px solid #667eea;
-                    }}
-                    .price-card {{
-                        background-color: #f9f9f9;
-                        border-left: 4px solid #667eea;
-                        padding: 15px;
-                        margin-bottom: 15px;
-                        border-radius: 4px;
-                    }}
-                    .price-row {{
-                        display: flex;
-                        justify-content: space-between;
-                        padding: 8px 0;
-                        border-bottom: 1px solid #eee;
-                    }}
-                    .price-row:last-child {{
-                        border-bottom: none;
-                    }}
-                    .label {{
-                        font-weight: bold;
-                        color: #666;
-                    }}
-                    .value {{
-                        color: #667eea;
-                        font-weight: bold;
-                        font-size: 16px;
-                    }}
-                    .highlight {{
-                        background-color: #fff3cd;
-                        padding: 2px 6px;
-                        border-radius: 3px;
-                    }}
-                    .table {{
-                        width: 100%;
-                        border-collapse: collapse;
-                        margin-top: 10px;
-                    }}
-                    .table th {{
-                        background-color: #f0f0f0;
-                        padding: 10px;
-                        text-align: left;
-                        border-bottom: 2px solid #667eea;
-                        font-weight: bold;
-                    }}
-                    .table td {{
-                        padding: 10px;
-                        border-bottom: 1px solid #eee;
-                    }}
-                    .reasons {{
-                        background-color: #f0f7ff;
-                        border-left: 4px solid #0066cc;
-                        padding: 15px;
-                        margin-top: 20px;
-                        border-radius: 4px;
-                    }}
-                    .reasons h3 {{
-                        margin-top: 0;
-                        color: #0066cc;
-                    }}
-                    .reason-item {{
-                        margin: 8px 0;
-                        color: #333;
-                        padding-left: 20px;
-                        position: relative;
-                    }}
-                    .reason-item:before {{
-                        content: "✓";
-                        position: absolute;
-                        left: 0;
-                        color: #0066cc;
-                        font-weight: bold;
-                    }}
-                    .footer {{
-                        background-color: #f5f5f5;
-                        padding: 20px;
-                        text-align: center;
-                        font-size: 12px;
-                        color: #999;
-                        border-top: 1px solid #eee;
-                    }}
-                    .tip {{
-                        background-color: #e8f5e9;
-                        border-left: 4px solid #4caf50;
-                        padding: 15px;
-                        margin-top: 20px;
-                        border-radius: 4px;
-                        font-size: 13px;
-                        color: #2e7d32;
-                    }}
+                    {EMAIL_CSS}
                 </style>
             </head>
             <body>
@@ -237,6 +300,7 @@ class EnhancedEmailNotifier:
 
                     <div class="content">
                         {self._generate_alert_section(alert_data)}
+                        {self._generate_instrument_alerts_section(alert_data)}
                         {self._generate_shanghai_gold_section(alert_data)}
                         {self._generate_bank_gold_section(alert_data)}
                         {self._generate_futures_section(alert_data)}
@@ -260,7 +324,7 @@ class EnhancedEmailNotifier:
     def _generate_alert_section(self, data: Dict) -> str:
         """生成提醒概览部分"""
         current_price = data.get('current_price', 0)
-        extremes = data.get('extremes', {})
+        extremes = data.get('extremes') or {}
 
         return f"""
         <div class="section">
@@ -548,6 +612,43 @@ class EnhancedEmailNotifier:
         </div>
         """
 
+    def _generate_instrument_alerts_section(self, data: Dict) -> str:
+        """生成各品种提醒部分"""
+        instrument_alerts = data.get('instrument_alerts') or {}
+        if not instrument_alerts:
+            return ""
+
+        rows = ""
+        for instrument, result in instrument_alerts.items():
+            reasons = '<br>'.join(result.get('alert_reasons', []))
+            rows += f"""
+            <tr>
+                <td>{instrument}</td>
+                <td style="font-weight: bold;">{result.get('current_price', '-')} 元/克</td>
+                <td>{result.get('alert_level', 'none').upper()}</td>
+                <td style="font-size: 12px;">{reasons}</td>
+            </tr>
+            """
+
+        return f"""
+        <div class="section">
+            <div class="section-title">📌 品种提醒</div>
+            <table class="table">
+                <thead>
+                    <tr>
+                        <th>品种</th>
+                        <th>当前价</th>
+                        <th>等级</th>
+                        <th>原因</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {rows}
+                </tbody>
+            </table>
+        </div>
+        """
+
     def _generate_reasons_section(self, data: Dict) -> str:
         """生成触发原因部分"""
         reasons = data.get('alert_reasons', [])
@@ -572,18 +673,25 @@ class EnhancedEmailNotifier:
         </div>
         """
 
-    def _send_smtp(self, msg: MIMEMultipart, recipient_email: str):
-        """通过SMTP发送邮件"""
+    def open_session(self) -> SmtpSession:
+        """创建可复用的SMTP会话（首次发送时才连接）"""
+        return SmtpSession(
+            self.smtp_config['smtp_server'],
+            self.smtp_config['smtp_port'],
+            self.email_address,
+            self.app_password,
+            max_messages_per_connection=self.max_messages_per_connection,
+            logger=self.logger
+        )
+
+    def _send_smtp(self, msg: MIMEMultipart, recipient_email: str, smtp: Optional[SmtpSession] = None):
+        """通过SMTP发送邮件（传入会话时复用其连接）"""
         try:
-            server = smtplib.SMTP(
-                self.smtp_config['smtp_server'],
-                self.smtp_config['smtp_port'],
-                timeout=10
-            )
-            server.starttls()
-            server.login(self.email_address, self.app_password)
-            server.send_message(msg, from_addr=self.email_address, to_addrs=recipient_email)
-            server.quit()
+            if smtp is not None:
+                smtp.send(msg, recipient_email)
+            else:
+                with self.open_session() as session:
+                    session.send(msg, recipient_email)
 
         except smtplib.SMTPAuthenticationError:
             raise Exception("邮箱认证失败，请检查邮箱地址和应用授权码")
@@ -593,8 +701,14 @@ class EnhancedEmailNotifier:
             raise Exception(f"邮件发送错误: {str(e)}")
 
     def send_batch_emails(self, recipient_emails: List[str], alert_data: Dict[str, Any]) -> Dict[str, bool]:
-        """批量发送邮件"""
-        results = {}
-        for email in recipient_emails:
-            results[email] = self.send_comprehensive_alert(email, alert_data)
+        """批量发送邮件（内容只渲染一次，收件人分配到若干个并发的SMTP连接上）"""
+        rendered = self.render_email(alert_data)
+        engine = DeliveryEngine(
+            self.open_session,
+            workers=min(self.smtp_config['max_connections'], self.max_connections or len(recipient_emails)),
+            logger=self.logger
+        )
+        results = engine.deliver(recipient_emails, lambda email: self._build_message(rendered, email))
+        if recipient_emails:
+            self.logger.info(f"批量发送 {len(recipient_emails)} 封邮件，共建立 {engine.connections} 个SMTP连接")
         return results
@@ -0,0 +1,286 @@
+"""
+邮件发件箱模块 - 持久化的待发送邮件队列
+分析流程只需把提醒写入磁盘上的发件箱，由后台投递线程负责发送、失败重试和去重；
+邮件只有在确认发送成功后才从发件箱移除（至少送达一次）
+"""
+import os
+import json
+import time
+import hmac
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# 发件箱含提醒内容，已加入 .gitignore，定时任务通过 Actions 缓存在运行之间保留；
+# 文件中只保存收件人地址的 HMAC，发送时再根据 RECIPIENT_EMAILS 还原
+OUTBOX_FILE = os.path.join('data', 'outbox.json')
+
+# 失败列表最多保留的条数
+MAX_FAILED_ENTRIES = 50
+
+
+def recipient_key(email: str, secret: str = '') -> str:
+    """
+    收件人地址的 HMAC（不区分大小写）
+
+    以密钥计算，拿到发件箱文件也无法通过常见邮箱字典反查收件人
+    """
+    return hmac.new(secret.encode('utf-8'), email.strip().lower().encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def alert_fingerprint(alert_data: Dict[str, Any]) -> str:
+    """提醒内容的指纹，相同内容的提醒对同一收件人只投递一次"""
+    raw = json.dumps(alert_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class EmailOutbox:
+    """磁盘持久化的发件箱"""
+
+    def __init__(self, path: str = OUTBOX_FILE, max_attempts: int = 8, retry_backoff: float = 60,
+                 max_backoff: float = 3600, dedup_seconds: float = 24 * 3600, secret: str = '',
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化发件箱
+
+        Args:
+            path: 发件箱文件路径
+            max_attempts: 单封邮件最多尝试次数，超过后移入失败列表
+            retry_backoff: 首次重试前的等待时间（秒），之后每次翻倍
+            max_backoff: 重试等待时间上限（秒）
+            dedup_seconds: 已送达记录的保留时长，期内重复入队的相同邮件会被忽略
+            secret: 计算收件人 HMAC 的密钥（密钥变化后旧的待发送邮件无法还原收件人，会被丢弃）
+            logger: 日志记录器
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.dedup_seconds = dedup_seconds
+        self.secret = secret
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._recipients: Dict[str, str] = {}
+        self.state = self._load()
+
+    def register_recipients(self, recipient_emails: List[str]):
+        """
+        登记当前配置的收件人，用于把发件箱中的地址 HMAC 还原为邮箱
+
+        Args:
+            recipient_emails: 收件人邮箱列表
+        """
+        with self._lock:
+            self._recipients.update({recipient_key(email, self.secret): email for email in recipient_emails})
+
+    def enqueue(self, recipient_emails: List[str], alert_data: Dict[str, Any]) -> int:
+        """
+        将提醒加入发件箱（同一提醒和收件人已在队列中或近期已送达时跳过，发件箱中只保存收件人地址的 HMAC）
+
+        Args:
+            recipient_emails: 收件人邮箱列表
+            alert_data: 提醒内容
+
+        Returns:
+            新加入的邮件数
+        """
+        alert_key = alert_fingerprint(alert_data)
+        now = time.time()
+        added = 0
+        with self._lock:
+            pending_ids = {entry['id'] for entry in self.state['pending']}
+            for email in recipient_emails:
+                recipient = recipient_key(email, self.secret)
+                self._recipients[recipient] = email
+                message_id = hashlib.sha1(f"{alert_key}:{recipient}".encode('utf-8')).hexdigest()
+                if message_id in pending_ids or message_id in self.state['delivered']:
+                    continue
+                self.state['pending'].append({
+                    'id': message_id,
+                    'alert': alert_key,
+                    'recipient': recipient,
+                    'attempts': 0,
+                    'created_at': now,
+                    'next_attempt_at': now,
+                })
+                pending_ids.add(message_id)
+                added += 1
+            if added:
+                self.state['alerts'][alert_key] = alert_data
+                self._save()
+        self.logger.info(f"发件箱新增 {added} 封邮件，待发送 {self.pending_count()} 封")
+        return added
+
+    def pending_count(self) -> int:
+        """待发送的邮件数"""
+        return len(self.state['pending'])
+
+    def due(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        取出已到发送时间的邮件，按提醒内容分组
+
+        收件人已从配置中移除的邮件无法还原地址，直接丢弃
+
+        Returns:
+            {提醒指纹: {'alert_data': 提醒内容, 'entries': [邮件, ...]}}，邮件的 email 字段为还原后的地址
+        """
+        now = now if now is not None else time.time()
+        groups: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            pending = []
+            for entry in self.state['pending']:
+                email = self._recipients.get(entry['recipient'])
+                if email is None:
+                    self.logger.warning(f"收件人 {entry['recipient'][:8]} 已不在配置中，丢弃待发送邮件")
+                    continue
+                pending.append(entry)
+                if entry['next_attempt_at'] <= now:
+                    group = groups.setdefault(entry['alert'], {
+                        'alert_data': self.state['alerts'].get(entry['alert'], {}),
+                        'entries': [],
+                    })
+                    group['entries'].append({**entry, 'email': email})
+            if len(pending) != len(self.state['pending']):
+                self.state['pending'] = pending
+                self._save()
+        return groups
+
+    def mark_results(self, results: Dict[str, bool], now: Optional[float] = None):
+        """
+        记录投递结果：成功的移出发件箱，失败的按指数退避安排重试
+
+        Args:
+            results: {邮件ID: 是否发送成功}
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            pending = []
+            for entry in self.state['pending']:
+                if entry['id'] not in results:
+                    pending.append(entry)
+                elif results[entry['id']]:
+                    self.state['delivered'][entry['id']] = now
+                else:
+                    entry['attempts'] += 1
+                    if entry['attempts'] >= self.max_attempts:
+                        email = self._recipients.get(entry['recipient'], entry['recipient'][:8])
+                        self.logger.error(f"发送到 {email} 的邮件已失败 {entry['attempts']} 次，放弃发送")
+                        self.state['failed'].append(entry)
+                        continue
+                    delay = min(self.retry_backoff * (2 ** (entry['attempts'] - 1)), self.max_backoff)
+                    entry['next_attempt_at'] = now + delay
+                    pending.append(entry)
+            self.state['pending'] = pending
+            self._prune(now)
+            self._save()
+
+    def _prune(self, now: float):
+        """清理过期的送达记录、过多的失败记录和不再被引用的提醒内容（调用方需持有锁）"""
+        cutoff = now - self.dedup_seconds
+        self.state['delivered'] = {
+            message_id: ts for message_id, ts in self.state['delivered'].items() if ts >= cutoff
+        }
+        self.state['failed'] = self.state['failed'][-MAX_FAILED_ENTRIES:]
+        referenced = {entry['alert'] for entry in self.state['pending'] + self.state['failed']}
+        self.state['alerts'] = {key: data for key, data in self.state['alerts'].items() if key in referenced}
+
+    def _load(self) -> Dict[str, Any]:
+        """读取发件箱文件"""
+        state = {'alerts': {}, 'pending': [], 'delivered': {}, 'failed': []}
+        if not os.path.exists(self.path):
+            return state
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state.update(json.load(f))
+        except Exception as e:
+            self.logger.warning(f"读取发件箱失败: {e}")
+        return state
+
+    def _save(self):
+        """原子写入发件箱文件（调用方需持有锁）"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.warning(f"保存发件箱失败: {e}")
+
+
+class OutboxWorker:
+    """后台投递线程：定期取出到期邮件发送"""
+
+    def __init__(self, outbox: EmailOutbox, send_batch: Callable[[List[str], Dict[str, Any]], Dict[str, bool]],
+                 poll_interval: float = 30, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            outbox: 发件箱
+            send_batch: 批量发送函数 (收件人列表, 提醒内容) -> {邮箱: 是否成功}
+            poll_interval: 检查发件箱的间隔（秒）
+            logger: 日志记录器
+        """
+        self.outbox = outbox
+        self.send_batch = send_batch
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动投递线程（守护线程，进程退出时未发送的邮件保留在发件箱文件中）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """有新邮件入队时立即唤醒投递线程"""
+        self._wakeup.set()
+
+    def drain(self) -> int:
+        """
+        发送一轮到期邮件
+
+        Returns:
+            本轮发送成功的邮件数
+        """
+        delivered = 0
+        for group in self.outbox.due().values():
+            entries = group['entries']
+            try:
+                sent = self.send_batch([entry['email'] for entry in entries], group['alert_data'])
+            except Exception as e:
+                self.logger.error(f"投递发件箱邮件失败: {e}")
+                sent = {}
+            results = {entry['id']: bool(sent.get(entry['email'])) for entry in entries}
+            self.outbox.mark_results(results)
+            delivered += sum(results.values())
+        return delivered
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        停止投递线程（会先完成当前一轮投递）
+
+        Args:
+            timeout: 最长等待时间（秒），超时后未发送的邮件保留在发件箱中
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.drain()
+            except Exception as e:
+                self.logger.error(f"发件箱投递线程异常: {e}")
+            if self._stop.is_set():
+                break
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
@@ -0,0 +1,153 @@
+"""
+SMTP会话模块 - 批量发送时复用同一个已认证的连接
+临时错误时重连并按抖动退避重试，每个连接发送一定数量的邮件后主动重建，避免触发邮箱服务商的单连接限制
+"""
+import time
+import random
+import smtplib
+import logging
+from email.message import Message
+from typing import Optional
+
+# 单个连接默认最多发送的邮件数
+DEFAULT_MAX_MESSAGES_PER_CONNECTION = 50
+
+
+class _TrackingSMTP(smtplib.SMTP):
+    """记录是否已开始发送 DATA 的SMTP连接"""
+
+    data_started = False
+
+    def data(self, msg):
+        self.data_started = True
+        return super().data(msg)
+
+
+def is_transient(error: Exception, data_started: bool) -> bool:
+    """
+    判断发送失败能否重试：只有确认服务器没有接收邮件时才重试，避免收件人收到重复邮件
+
+    - 服务器返回 4xx 临时错误（包括 DATA 阶段的 4xx 回复，此时服务器明确未接收）
+    - 连接断开、超时等网络错误，且发生在开始发送 DATA 之前
+
+    Args:
+        error: 发送时抛出的异常
+        data_started: 出错时是否已开始发送 DATA（之后连接中断无法确认邮件是否已送达）
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPNotSupportedError):
+        return False
+    return isinstance(error, OSError) and not data_started
+
+
+class SmtpSession:
+    """可复用的已认证SMTP连接"""
+
+    def __init__(self, smtp_server: str, smtp_port: int, email_address: str, app_password: str,
+                 max_messages_per_connection: int = DEFAULT_MAX_MESSAGES_PER_CONNECTION,
+                 timeout: float = 10, max_attempts: int = 3, retry_backoff: float = 1.0,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化SMTP会话（首次发送时才建立连接）
+
+        Args:
+            smtp_server: SMTP服务器地址
+            smtp_port: SMTP端口（STARTTLS）
+            email_address: 发件人邮箱
+            app_password: 邮箱授权码
+            max_messages_per_connection: 单个连接最多发送的邮件数，达到后重建连接
+            timeout: 网络超时（秒）
+            max_attempts: 单封邮件遇到临时错误时最多尝试的次数
+            retry_backoff: 首次重试前的最长等待时间（秒），之后每次翻倍，实际等待时间在 0 到该值之间随机
+            logger: 日志记录器
+        """
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.email_address = email_address
+        self.app_password = app_password
+        self.max_messages_per_connection = max(1, max_messages_per_connection)
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.logger = logger or logging.getLogger(__name__)
+        self.server: Optional[smtplib.SMTP] = None
+        self.sent_on_connection = 0
+        self.connections = 0
+
+    def connect(self):
+        """建立连接并完成 STARTTLS 和登录"""
+        self.close()
+        server = _TrackingSMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            server.starttls()
+            server.login(self.email_address, self.app_password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.sent_on_connection = 0
+        self.connections += 1
+        self.logger.debug(f"SMTP连接已建立（第 {self.connections} 个）")
+
+    def send(self, msg: Message, recipient_email: str):
+        """
+        发送一封邮件，临时错误（见 is_transient）时重建连接并按抖动退避重试
+
+        Args:
+            msg: 邮件内容
+            recipient_email: 收件人邮箱
+
+        Raises:
+            smtplib.SMTPException / OSError: 非临时错误，或重试次数用尽后仍发送失败
+        """
+        if self.server is not None and self.sent_on_connection >= self.max_messages_per_connection:
+            self.logger.debug(f"当前连接已发送 {self.sent_on_connection} 封邮件，重建连接")
+            self.close()
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if self.server is None:
+                    self.connect()
+                self.server.data_started = False
+                self.server.send_message(msg, from_addr=self.email_address, to_addrs=recipient_email)
+                self.sent_on_connection += 1
+                return
+            except OSError as e:
+                data_started = self.server is not None and self.server.data_started
+                # 出错后连接状态不确定，下次尝试重新建立连接
+                self._discard()
+                if attempt >= self.max_attempts or not is_transient(e, data_started):
+                    raise
+                delay = random.uniform(0, self.retry_backoff * 2 ** (attempt - 1))
+                self.logger.warning(f"发送到 {recipient_email} 遇到临时错误，{delay:.1f}s 后第 {attempt + 1} 次尝试: {e}")
+                time.sleep(delay)
+
+    def close(self):
+        """正常断开连接"""
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        finally:
+            self.server = None
+            self.logger.debug("SMTP连接已关闭")
+
+    def _discard(self):
+        """丢弃已失效的连接"""
+        if self.server is not None:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+            self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,15 +1,22 @@
 """
 GitHub Actions 单次运行脚本 - 聚合数据版
 使用聚合数据API获取上海黄金交易所和期货交易所的金价数据
+
+常驻运行: python run_once.py --daemon [--interval 秒]
 """
 import os
 import sys
-import json
+import time
+import asyncio
+import signal
 import logging
+import argparse
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Iterable, List, Optional
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent))
@@ -17,10 +24,17 @@ sys.path.insert(0, str(Path(__file__).parent))
 from config.config_loader import ConfigLoader
 from api.juhe_gold_api import JuheGoldAPI
 from api.xiaoxiao_gold_api import XiaoxiaoGoldAPI
+from api.http_session import get_session, close_session, get_connection_stats
+from api.fx_rate_cache import get_fx_rate_cache
+from api.quota_budget import QuotaBudget
+from api.market_calendar import MARKET_SESSIONS, add_holidays, is_market_open
+from api.quote import parse_xiaoxiao_payload
 from notifications.enhanced_email_notifier import EnhancedEmailNotifier
-
-# 历史价格文件
-PRICE_HISTORY_FILE = 'price_history.json'
+from notifications.outbox import EmailOutbox, OutboxWorker
+from database.db_manager import DatabaseManager
+from database.history_store import HistoryStore, WINDOWS
+from alerts.rolling_extremes import RollingExtremes, load_series_windows, save_series_windows
+from alerts.alert_state import AlertStateMachine, LEVEL_RANK, alert_signal
 
 
 def setup_logger() -> logging.Logger:
@@ -35,49 +49,115 @@ def setup_logger() -> logging.Logger:
     return logger
 
 
-def fetch_gold_price_fallback(logger: logging.Logger) -> Optional[Dict[str, Any]]:
-    """
-    备用金价获取（当极速数据API不可用时）
-    使用免费的国际金价API
-    """
-    # 数据源1：gold-api.com
+def _fetch_from_gold_api(session: requests.Session, logger: logging.Logger,
+                         cancelled: threading.Event) -> Optional[float]:
+    """备用数据源：gold-api.com 国际金价（美元/盎司，需换算为人民币/克）"""
     try:
-        resp = requests.get('https://api.gold-api.com/price/XAU', timeout=15)
+        resp = session.get('https://api.gold-api.com/price/XAU', timeout=15)
         if resp.status_code == 200:
             gold_data = resp.json()
             usd_per_oz = gold_data.get('price')
-            if usd_per_oz:
-                resp2 = requests.get('https://api.exchangerate-api.com/v4/latest/USD', timeout=15)
-                if resp2.status_code == 200:
-                    cny_rate = resp2.json()['rates'].get('CNY', 7.1)
-                else:
-                    cny_rate = 7.1
-                cny_per_gram = round(usd_per_oz * cny_rate / 31.1035, 2)
-                logger.info(f"备用数据源获取成功: {cny_per_gram} 元/克")
-                return {
-                    'price': cny_per_gram,
-                    'source': 'gold-api',
-                    'timestamp': datetime.now().isoformat()
-                }
+            if usd_per_oz and not cancelled.is_set():
+                cny_rate = get_fx_rate_cache(logger).get_rate()
+                return round(usd_per_oz * cny_rate / 31.1035, 2)
     except Exception as e:
-        logger.warning(f"备用数据源失败: {e}")
+        logger.warning(f"备用数据源 gold-api 失败: {e}")
+    return None
 
-    # 数据源2：metals.dev
+
+def _fetch_from_metals_dev(session: requests.Session, logger: logging.Logger,
+                           cancelled: threading.Event) -> Optional[float]:
+    """备用数据源：metals.dev（直接返回人民币/克）"""
     try:
-        resp = requests.get('https://api.metals.dev/v1/latest?api_key=demo&currency=CNY&unit=gram', timeout=15)
+        resp = session.get('https://api.metals.dev/v1/latest?api_key=demo&currency=CNY&unit=gram', timeout=15)
         if resp.status_code == 200:
             data = resp.json()
             gold_price = data.get('metals', {}).get('gold')
             if gold_price:
-                cny_per_gram = round(float(gold_price), 2)
-                logger.info(f"备用数据源2获取成功: {cny_per_gram} 元/克")
-                return {
-                    'price': cny_per_gram,
-                    'source': 'metals.dev',
-                    'timestamp': datetime.now().isoformat()
-                }
+                return round(float(gold_price), 2)
     except Exception as e:
-        logger.warning(f"备用数据源2失败: {e}")
+        logger.warning(f"备用数据源 metals.dev 失败: {e}")
+    return None
+
+
+# 备用数据源注册表（默认优先级即定义顺序）
+FALLBACK_SOURCES = {
+    'gold-api': _fetch_from_gold_api,
+    'metals.dev': _fetch_from_metals_dev,
+}
+
+
+def _race_fallback_sources(names: List[str], hedge_delay: float, session: requests.Session,
+                           logger: logging.Logger) -> Optional[Dict[str, Any]]:
+    """
+    对冲请求备用数据源
+
+    按优先级依次启动数据源，前一个在 hedge_delay 秒内未返回（或已失败）时立即启动下一个，
+    取第一个有效价格并放弃其余请求。hedge_delay 为 0 时所有数据源同时启动。
+    """
+    if not names:
+        return None
+
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(names))
+    pending = {}
+    next_index = 0
+
+    try:
+        while next_index < len(names) or pending:
+            timeout = None
+            if next_index < len(names):
+                name = names[next_index]
+                next_index += 1
+                pending[executor.submit(FALLBACK_SOURCES[name], session, logger, cancelled)] = name
+                if next_index < len(names):
+                    timeout = hedge_delay
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                price = future.result()
+                if price:
+                    logger.info(f"备用数据源 {name} 获取成功: {price} 元/克")
+                    return {
+                        'price': price,
+                        'source': name,
+                        'timestamp': datetime.now().isoformat()
+                    }
+    finally:
+        # 通知仍在进行的数据源尽快结束，不再等待其结果
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return None
+
+
+def fetch_gold_price_fallback(logger: logging.Logger,
+                              session: Optional[requests.Session] = None,
+                              priority: Optional[List[str]] = None,
+                              hedge_delay: float = 2.0) -> Optional[Dict[str, Any]]:
+    """
+    备用金价获取（当极速数据API不可用时）
+    使用免费的国际金价API
+
+    Args:
+        logger: 日志记录器
+        session: HTTP会话，默认使用共享会话
+        priority: 数据源优先级列表，默认为 FALLBACK_SOURCES 的定义顺序
+        hedge_delay: 启动下一个数据源前的等待时间（秒），0 表示全部并行
+    """
+    session = session or get_session()
+
+    names = []
+    for name in (priority or FALLBACK_SOURCES):
+        if name in FALLBACK_SOURCES:
+            names.append(name)
+        else:
+            logger.warning(f"未知的备用数据源: {name}")
+
+    result = _race_fallback_sources(names, hedge_delay, session, logger)
+    if result:
+        return result
 
     # 手动设置价格（测试用）
     manual_price = os.environ.get('MANUAL_GOLD_PRICE')
@@ -97,36 +177,162 @@ def fetch_gold_price_fallback(logger: logging.Logger) -> Optional[Dict[str, Any]
     return None
 
 
-def load_price_history(logger: logging.Logger) -> list:
-    """加载历史价格记录"""
-    if os.path.exists(PRICE_HISTORY_FILE):
-        try:
-            with open(PRICE_HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.warning(f"加载历史价格失败: {e}")
-    return []
+def load_price_window(history_store: HistoryStore, logger: logging.Logger) -> RollingExtremes:
+    """
+    加载24小时滚动极值窗口
 
+    优先使用持久化的窗口状态，不存在时用历史记录重建（休市期间的冻结报价不参与极值计算）
+    """
+    window = RollingExtremes.load(logger=logger)
+    if window is None:
+        window = RollingExtremes(WINDOWS['24h'])
+        window.extend(
+            (record['price'], record['timestamp'])
+            for record in history_store.window(WINDOWS['24h'], include_frozen=False)
+        )
+        logger.info(f"已根据历史记录重建滚动极值窗口: {len(window)} 个数据点")
+    window.evict()
+    return window
 
-def save_price_history(history: list, logger: logging.Logger):
-    """保存历史价格记录（只保留最近48条，即24小时 x 每30分钟1条）"""
-    history = history[-48:]
-    try:
-        with open(PRICE_HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
-        logger.info(f"已保存 {len(history)} 条历史价格记录")
-    except Exception as e:
-        logger.error(f"保存历史价格失败: {e}")
+
+def build_summary_windows(history_store: HistoryStore, price_window: RollingExtremes) -> Dict[str, RollingExtremes]:
+    """
+    邮件价格概况使用的各时间窗口（WINDOWS）
+
+    24小时窗口即提醒分析使用的 price_window，其余窗口启动时由历史记录重建一次，之后随每次价格增量更新
+    """
+    windows = {}
+    for name, seconds in WINDOWS.items():
+        if seconds == price_window.window_seconds:
+            windows[name] = price_window
+            continue
+        windows[name] = RollingExtremes(seconds)
+        windows[name].extend(
+            (record['price'], record['timestamp'])
+            for record in history_store.window(seconds, include_frozen=False)
+        )
+    return windows
+
+
+# 交易所关键行情（聚合数据API返回的字典中带有品种代码 instrument）
+EXCHANGE_KEYS = ('au9999', 'au_td', 'futures_main')
+
+
+def build_series(key_prices: Dict[str, Any], xiaoxiao_data: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    将所有数据源的行情统一为按品种代码索引的价格
+
+    品种代码形如 sge.au9999、shfe.au_main、bank.icbc、store.<品牌>、recycle.<类型>，
+    银行、金店和回收价格使用完整列表（不受邮件展示条数限制）
+
+    Args:
+        key_prices: 聚合数据API的关键金价
+        xiaoxiao_data: 小小API返回的全部数据
+
+    Returns:
+        {品种代码: 价格}
+    """
+    series = {}
+    for key in EXCHANGE_KEYS:
+        quote = key_prices.get(key)
+        if quote:
+            series[quote['instrument']] = quote['price']
+
+    for quote in parse_xiaoxiao_payload(xiaoxiao_data):
+        series[quote.instrument] = quote.price
+
+    return series
+
+
+def load_instrument_windows(history_store: HistoryStore, logger: logging.Logger) -> Dict[str, RollingExtremes]:
+    """
+    加载各品种的24小时滚动极值窗口
+
+    优先使用持久化的窗口状态，不存在时用历史记录中的 series 字段重建
+    """
+    windows = load_series_windows(logger=logger)
+    if windows is None:
+        windows = {}
+        for instrument, samples in history_store.series_samples(WINDOWS['24h']).items():
+            windows[instrument] = RollingExtremes(WINDOWS['24h'])
+            windows[instrument].extend(samples)
+        if windows:
+            logger.info(f"已根据历史记录重建 {len(windows)} 个品种的滚动极值窗口")
+    for window in windows.values():
+        window.evict()
+    return windows
+
+
+# 不做提醒分析的品种前缀（回收价下跌不是买入信号）
+SERIES_ALERT_EXCLUDE = ('recycle.',)
+
+
+def analyze_series(series: Dict[str, float], windows: Dict[str, RollingExtremes], threshold: float,
+                   logger: logging.Logger) -> Dict[str, Dict[str, Any]]:
+    """
+    逐个品种分析价格（只使用本次已获取的数据，不额外调用接口）
+
+    回收价不参与分析；24小时内价格没有变化（最高价等于最低价）且本次也未下跌的品种
+    （银行、金店挂牌价常见）会被当作"最低价"，同样跳过
+
+    Returns:
+        {品种代码: 分析结果}
+    """
+    results = {}
+    for instrument, price in series.items():
+        if instrument.startswith(SERIES_ALERT_EXCLUDE):
+            continue
+        window = windows.get(instrument) or RollingExtremes(WINDOWS['24h'])
+        if len(window) and window.highest == window.lowest and price >= window.lowest:
+            continue
+        results[instrument] = analyze_price(price, window, threshold, logger, product_name=instrument)
+    return results
+
+
+def update_instrument_windows(series: Dict[str, float], windows: Dict[str, RollingExtremes],
+                              timestamp: str, stale: Iterable[str] = ()) -> List[str]:
+    """
+    将本次行情写入各品种窗口（由调用方负责保存）
+
+    交易所品种在休市期间与上一次相同的报价视为冻结报价，不写入窗口；
+    开市期间来自过期缓存的过时行情（stale）同样不写入窗口
+
+    Returns:
+        冻结报价的品种代码列表
+    """
+    frozen = []
+    for instrument, price in series.items():
+        if instrument in stale:
+            continue
+        window = windows.setdefault(instrument, RollingExtremes(WINDOWS['24h']))
+        market = instrument.split('.', 1)[0]
+        if market in MARKET_SESSIONS and not is_market_open(market) and window.last_price == price:
+            frozen.append(instrument)
+            continue
+        window.push(price, timestamp)
+    return frozen
+
+
+# 24小时波动幅度提醒阈值（百分比）
+VOLATILITY_THRESHOLD = 2.0
+
+
+def calculate_volatility(window: RollingExtremes) -> float:
+    """计算窗口内的波动幅度（最高最低价差占最高价的百分比）"""
+    if len(window) == 0 or window.highest <= 0:
+        return 0.0
+    return round((window.highest - window.lowest) / window.highest * 100, 2)
 
 
-def analyze_price(current_price: float, history: list, threshold: float, logger: logging.Logger) -> Dict[str, Any]:
+def analyze_price(current_price: float, window: RollingExtremes, threshold: float,
+                  logger: logging.Logger, product_name: str = 'AU9999') -> Dict[str, Any]:
     """
     分析价格，判断是否需要发送提醒
     """
-    if not history:
-        logger.info("无历史数据，跳过分析")
+    if len(window) == 0:
+        logger.info(f"{product_name} 无历史数据，跳过分析")
         return {
-            'product_name': 'AU9999',
+            'product_name': product_name,
             'current_price': current_price,
             'should_alert': False,
             'alert_reasons': ['首次运行，无历史数据'],
@@ -136,9 +342,8 @@ def analyze_price(current_price: float, history: list, threshold: float, logger:
             'timestamp': datetime.now().isoformat()
         }
 
-    prices = [record['price'] for record in history]
-    highest_price = max(prices)
-    lowest_price = min(prices)
+    highest_price = window.highest
+    lowest_price = window.lowest
     price_range = highest_price - lowest_price
 
     absolute_diff = highest_price - current_price
@@ -148,7 +353,7 @@ def analyze_price(current_price: float, history: list, threshold: float, logger:
         'highest_price_24h': highest_price,
         'lowest_price_24h': lowest_price,
         'price_range': round(price_range, 2),
-        'data_points': len(history)
+        'data_points': len(window)
     }
 
     price_diff = {
@@ -157,51 +362,66 @@ def analyze_price(current_price: float, history: list, threshold: float, logger:
         'is_below_highest': current_price < highest_price
     }
 
-    alert_reasons = []
-    alert_level = 'none'
-
-    # 条件1：当前价格是历史最低价
-    if current_price <= lowest_price:
-        alert_reasons.append(f"当前价格 {current_price} 元/克 是近24小时最低价")
-        alert_level = 'high'
-
-    # 条件2：价格下跌超过阈值
-    if percentage_diff >= threshold:
-        alert_reasons.append(
-            f"价格从最高价 {highest_price} 元/克下跌了 {percentage_diff}%（阈值: {threshold}%）"
-        )
-        if alert_level == 'none':
-            alert_level = 'medium'
-        elif alert_level == 'medium':
-            alert_level = 'high'
-
-    # 条件3：价格大幅波动
-    if price_range > 0 and (price_range / highest_price * 100) > 2:
-        alert_reasons.append(f"24小时价格波动幅度较大: {round(price_range, 2)} 元/克")
-        if alert_level == 'none':
-            alert_level = 'low'
-
-    should_alert = len(alert_reasons) > 0
-
-    logger.info(f"分析结果: 当前价格={current_price}, 最高价={highest_price}, "
+    # 波动幅度（最高最低价差占最高价的百分比），也是最低价距最高价的跌幅
+    range_percent = price_range / highest_price * 100 if highest_price > 0 else 0
+
+    # 各条件的程度（距最高价的百分比），无论是否满足都交给提醒状态机判断是否解除
+    alert_signals = [
+        # 条件1：当前价格是24小时最低价
+        alert_signal('new_low', percentage_diff, round(range_percent, 2), 'high',
+                     f"当前价格 {current_price} 元/克 是近24小时最低价",
+                     triggered=current_price <= lowest_price),
+        # 条件2：价格下跌超过阈值
+        alert_signal('drop', percentage_diff, threshold, 'medium',
+                     f"价格从最高价 {highest_price} 元/克下跌了 {percentage_diff}%（阈值: {threshold}%）",
+                     triggered=percentage_diff >= threshold),
+        # 条件3：价格大幅波动
+        alert_signal('volatility', range_percent, VOLATILITY_THRESHOLD, 'low',
+                     f"24小时价格波动幅度较大: {round(price_range, 2)} 元/克",
+                     triggered=range_percent > VOLATILITY_THRESHOLD),
+    ]
+
+    # 提醒原因和等级都由满足条件的信号得出，等级取最高的一个
+    triggered = [signal for signal in alert_signals if signal['triggered']]
+    alert_reasons = [signal['message'] for signal in triggered]
+    alert_level = max((signal['level'] for signal in triggered), key=LEVEL_RANK.get, default='none')
+    should_alert = bool(triggered)
+
+    logger.info(f"{product_name} 分析结果: 当前价格={current_price}, 最高价={highest_price}, "
                 f"最低价={lowest_price}, 下跌={percentage_diff}%, 需要提醒={should_alert}")
 
     return {
-        'product_name': 'AU9999',
+        'product_name': product_name,
         'current_price': current_price,
         'should_alert': should_alert,
         'alert_reasons': alert_reasons,
         'alert_level': alert_level,
         'extremes': extremes,
         'price_diff': price_diff,
+        'alert_signals': alert_signals,
         'timestamp': datetime.now().isoformat()
     }
 
 
-def send_email_alert(alert_result: Dict[str, Any], config: ConfigLoader, logger: logging.Logger) -> bool:
-    """发送邮件提醒"""
+def create_notifier(config: ConfigLoader) -> EnhancedEmailNotifier:
+    """按配置创建邮件通知器"""
+    email_config = config.get_email_config()
+    return EnhancedEmailNotifier(
+        email_address=email_config['email_address'],
+        app_password=email_config['app_password'],
+        email_type=email_config['email_type'],
+        max_messages_per_connection=email_config['max_messages_per_connection']
+    )
+
+
+def send_email_alert(alert_result: Dict[str, Any], config: ConfigLoader, logger: logging.Logger,
+                     outbox: Optional[EmailOutbox] = None, worker: Optional[OutboxWorker] = None) -> bool:
+    """
+    发送邮件提醒
+
+    传入发件箱时只将提醒写入发件箱并唤醒投递线程，不等待邮件服务器；否则直接发送
+    """
     try:
-        email_config = config.get_email_config()
         recipients = config.get_recipient_emails()
         alert_config = config.get_alert_config()
 
@@ -217,13 +437,13 @@ def send_email_alert(alert_result: Dict[str, Any], config: ConfigLoader, logger:
             logger.info(f"[测试模式] 模拟发送邮件到: {', '.join(recipients)}")
             return True
 
-        notifier = EnhancedEmailNotifier(
-            email_address=email_config['email_address'],
-            app_password=email_config['app_password'],
-            email_type=email_config['email_type']
-        )
+        if outbox is not None:
+            outbox.enqueue(recipients, alert_result)
+            if worker is not None:
+                worker.notify()
+            return True
 
-        results = notifier.send_batch_emails(recipients, alert_result)
+        results = create_notifier(config).send_batch_emails(recipients, alert_result)
         success_count = sum(1 for v in results.values() if v)
         logger.info(f"邮件发送完成: 成功 {success_count}/{len(results)}")
         return success_count > 0
@@ -233,107 +453,251 @@ def send_email_alert(alert_result: Dict[str, Any], config: ConfigLoader, logger:
         return False
 
 
-def main():
-    """主函数 - 单次运行（聚合数据版）"""
-    logger = setup_logger()
-    logger.info("=" * 60)
-    logger.info("积存金价格监控 - GitHub Actions 单次运行（聚合数据版）")
-    logger.info(f"运行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info("=" * 60)
+def log_connection_stats(logger: logging.Logger):
+    """输出共享会话的连接复用统计"""
+    for host, stats in get_connection_stats().items():
+        logger.info(f"连接统计 {host}: 请求 {stats['requests']} 次, "
+                    f"新建连接 {stats['connections']} 个, 复用 {stats['reused']} 次")
+
 
-    # 加载配置
+def load_config(logger: logging.Logger) -> ConfigLoader:
+    """加载配置，.env 文件不可用时只使用环境变量"""
     try:
-        config = ConfigLoader()
+        return ConfigLoader()
     except Exception as e:
         logger.warning(f"加载 .env 文件失败 ({e})，将使用环境变量")
         config = ConfigLoader.__new__(ConfigLoader)
         config.env_path = '.env'
         config.config = {}
         config.load_config()
+        return config
 
-    # 获取下跌阈值
-    alert_config = config.get_alert_config()
-    threshold = alert_config['drop_threshold_percent']
-    logger.info(f"下跌阈值: {threshold}%")
 
-    # 获取聚合数据API密钥
-    juhe_api_key = os.environ.get('JUHE_API_KEY')
+# 退出前等待发件箱投递的最长时间（秒）
+OUTBOX_FLUSH_TIMEOUT = 60
 
-    # 初始化金价数据
-    current_price = None
-    key_prices = {}
+# 退出前等待汇率后台刷新写完缓存的最长时间（秒）
+FX_REFRESH_TIMEOUT = 5
 
-    if juhe_api_key:
-        logger.info("=" * 60)
-        logger.info("使用聚合数据API获取金价数据...")
-        logger.info("=" * 60)
 
-        try:
-            # 使用聚合数据API获取所有金价
-            juhe_api = JuheGoldAPI(juhe_api_key, logger)
-            key_prices = juhe_api.get_key_prices()
-
-            # 优先使用上海黄金交易所Au99.99价格
-            if key_prices.get('au9999'):
-                current_price = key_prices['au9999']['price']
-                logger.info(f"✓ 使用上海黄金交易所Au99.99价格: {current_price} 元/克")
-            # 其次使用黄金延期Au(T+D)价格
-            elif key_prices.get('au_td'):
-                current_price = key_prices['au_td']['price']
-                logger.info(f"✓ 使用黄金延期Au(T+D)价格: {current_price} 元/克")
-            # 最后使用期货主力合约价格
-            elif key_prices.get('futures_main'):
-                current_price = key_prices['futures_main']['price']
-                logger.info(f"✓ 使用沪金主力合约价格: {current_price} 元/克")
+class GoldMonitor:
+    """
+    金价监控
 
-        except Exception as e:
-            logger.error(f"聚合数据API获取失败: {e}")
+    配置、HTTP会话、API客户端、历史记录和滚动窗口只在创建时加载一次，
+    之后每次 run_cycle 只做取数、分析和提醒，适合单次运行和常驻模式共用
+    """
 
-    # 获取银行金价数据（小小API - 完全免费）
-    logger.info("=" * 60)
-    logger.info("获取银行金价数据...")
-    logger.info("=" * 60)
+    def __init__(self, config: ConfigLoader, logger: logging.Logger):
+        """
+        Args:
+            config: 配置
+            logger: 日志记录器
+        """
+        self.config = config
+        self.logger = logger
 
-    bank_prices = {}
-    brand_prices = []
-    recycle_prices = []
+        # 获取下跌阈值
+        alert_config = config.get_alert_config()
+        self.threshold = alert_config['drop_threshold_percent']
+        logger.info(f"下跌阈值: {self.threshold}%")
+
+        # 按品种、原因记录已发送的提醒，条件持续时只在程度加深时再次提醒
+        self.alert_state = AlertStateMachine(
+            cooldown_seconds=alert_config['cooldown_minutes'] * 60,
+            hysteresis=alert_config['hysteresis_percent'],
+            escalation_step=alert_config['escalation_step_percent'],
+            logger=logger
+        )
 
-    try:
-        xiaoxiao_api = XiaoxiaoGoldAPI(logger)
+        # 追加配置的休市日期
+        add_holidays(config.get('MARKET_HOLIDAYS', '').split(','))
+
+        # 所有数据源共用一个带连接池的会话
+        self.session = get_session()
+
+        # 加载历史价格（近期波动幅度用于分配API配额）
+        self.history_store = HistoryStore(logger=logger)
+        history = self.history_store.load()
+        self.window = load_price_window(self.history_store, logger)
+        self.summary_windows = build_summary_windows(self.history_store, self.window)
+        self.instrument_windows = load_instrument_windows(self.history_store, logger)
+        logger.info(f"历史记录: {len(history)} 条，24小时窗口: {len(self.window)} 个数据点")
+
+        # 进入滚动窗口的价格同时按品种写入数据库，供按时间范围查询
+        self.db = DatabaseManager(config.get_database_config()['database_path'], logger=logger)
+
+        # 聚合数据API（未配置密钥时不启用）
+        self.juhe_api_key = os.environ.get('JUHE_API_KEY')
+        self.quota_config = config.get_quota_config()
+        self.budget = None
+        self.juhe_api = None
+        if self.juhe_api_key:
+            self.budget = QuotaBudget(
+                limits={JuheGoldAPI.PROVIDER: self.quota_config['juhe_daily_quota']}, logger=logger
+            )
+            self.juhe_api = JuheGoldAPI(self.juhe_api_key, logger, session=self.session, budget=self.budget)
+
+        self.xiaoxiao_api = XiaoxiaoGoldAPI(logger, session=self.session)
+
+        # 邮件先写入发件箱，由后台线程投递，分析流程不等待邮件服务器
+        # 收件人 HMAC 以邮箱授权码为密钥，该密钥只存在于 Secrets 中
+        self.outbox = EmailOutbox(secret=config.get_email_config()['app_password'], logger=logger)
+        self.outbox.register_recipients(config.get_recipient_emails())
+        self.outbox_worker = OutboxWorker(self.outbox, self._send_batch, logger=logger)
+        self.outbox_worker.start()
+
+    def run_cycle(self) -> Optional[Dict[str, Any]]:
+        """
+        执行一次监控：获取金价、分析、记录历史并按需发送提醒
+
+        Returns:
+            提醒结果，所有数据源都失败时返回 None
+        """
+        return asyncio.run(self.run_cycle_async())
+
+    async def run_cycle_async(self) -> Optional[Dict[str, Any]]:
+        """
+        以流水线方式执行一次监控：获取 → 标准化 → 分析 → 通知
+
+        各阶段通过有界队列衔接，互不依赖的数据源在线程中同时请求，
+        分析完成后立即开始发送通知，总耗时接近最慢的一条路径而非各阶段之和
+
+        Returns:
+            提醒结果，所有数据源都失败时返回 None
+        """
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=len(self.fetchers))
+        normalized: asyncio.Queue = asyncio.Queue(maxsize=1)
+        analyzed: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        stages = [
+            *(self._fetch_stage(name, fetch, fetched) for name, fetch in self.fetchers.items()),
+            self._normalize_stage(fetched, normalized),
+            self._analyze_stage(normalized, analyzed),
+            self._notify_stage(analyzed),
+        ]
+        results = await asyncio.gather(*stages)
+        return results[-1]
+
+    async def _fetch_stage(self, name: str, fetch: Callable[[], Any], out: asyncio.Queue):
+        """获取阶段：在线程中调用阻塞的数据源客户端，结果放入队列"""
+        try:
+            result = await asyncio.to_thread(fetch)
+        except Exception as e:
+            self.logger.error(f"数据源 {name} 获取失败: {e}")
+            result = None
+        await out.put((name, result))
+
+    async def _normalize_stage(self, inp: asyncio.Queue, out: asyncio.Queue):
+        """标准化阶段：汇总各数据源结果，确定当前价格并整理品种行情"""
+        results = {}
+        for _ in range(len(self.fetchers)):
+            name, result = await inp.get()
+            results[name] = result
+        snapshot = self._normalize(results.get('juhe') or {}, results.get('xiaoxiao'))
+        if snapshot['current_price'] is None:
+            snapshot = await asyncio.to_thread(self._apply_fallback, snapshot)
+        await out.put(snapshot)
+
+    async def _analyze_stage(self, inp: asyncio.Queue, out: asyncio.Queue):
+        """分析阶段：计算提醒条件并追加历史记录"""
+        snapshot = await inp.get()
+        alert_result = self._analyze(snapshot) if snapshot['current_price'] is not None else None
+        await out.put(alert_result)
+
+    async def _notify_stage(self, inp: asyncio.Queue) -> Optional[Dict[str, Any]]:
+        """通知阶段：分析结果一到即发送提醒"""
+        alert_result = await inp.get()
+        if alert_result is not None:
+            await asyncio.to_thread(self._notify, alert_result)
+        log_connection_stats(self.logger)
+        return alert_result
+
+    def _fetch_juhe(self) -> Dict[str, Any]:
+        """获取聚合数据API关键金价（按配额预算决定是否只用缓存）"""
+        logger = self.logger
+        logger.info("使用聚合数据API获取金价数据...")
 
-        # 一次性获取所有数据（避免重复调用）
-        all_xiaoxiao_data = xiaoxiao_api.fetch_all_gold_prices()
+        # 按配额预算决定本次是否调用接口（每次轮询调用 shgold、shfutures 两个接口）
+        if self.quota_config['adaptive_polling']:
+            volatility = calculate_volatility(self.window)
+            offline = not self.budget.should_poll(JuheGoldAPI.PROVIDER, cost=2, volatility=volatility)
+        else:
+            offline = False
+        if offline:
+            logger.info("本次使用聚合数据API缓存数据")
+
+        self.juhe_api.offline = offline
+        key_prices = self.juhe_api.get_key_prices()
+        logger.info(f"聚合数据API今日已用 {self.budget.used(JuheGoldAPI.PROVIDER)}/"
+                    f"{self.quota_config['juhe_daily_quota']} 次")
+        return key_prices
+
+    def _fetch_xiaoxiao(self) -> Optional[Dict[str, Any]]:
+        """获取银行金价数据（小小API - 完全免费，一次性获取所有数据）"""
+        self.logger.info("获取银行金价数据...")
+        return self.xiaoxiao_api.fetch_all_gold_prices()
+
+    @property
+    def fetchers(self) -> Dict[str, Callable[[], Any]]:
+        """本次需要并行请求的数据源"""
+        fetchers = {'xiaoxiao': self._fetch_xiaoxiao}
+        if self.juhe_api:
+            fetchers['juhe'] = self._fetch_juhe
+        return fetchers
+
+    def _normalize(self, juhe_prices: Dict[str, Any], all_xiaoxiao_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        汇总各数据源结果
+
+        Returns:
+            {'current_price', 'price_instrument', 'price_market', 'key_prices', 'series'}
+        """
+        logger = self.logger
+        key_prices = dict(juhe_prices)
+        current_price = None
+        price_instrument = None  # 当前价格对应的品种代码，按品种分析时跳过，避免同一行情提醒两次
+        price_market = None  # 当前价格所属交易所，用于识别休市期间的重复行情
+        price_stale = False  # 当前价格是否为开市期间的过时缓存行情
+
+        # 优先使用上海黄金交易所Au99.99价格
+        if key_prices.get('au9999'):
+            current_price = key_prices['au9999']['price']
+            price_instrument = key_prices['au9999'].get('instrument')
+            price_market = 'sge'
+            price_stale = key_prices['au9999'].get('stale', False)
+            logger.info(f"✓ 使用上海黄金交易所Au99.99价格: {current_price} 元/克")
+        # 其次使用黄金延期Au(T+D)价格
+        elif key_prices.get('au_td'):
+            current_price = key_prices['au_td']['price']
+            price_instrument = key_prices['au_td'].get('instrument')
+            price_market = 'sge'
+            price_stale = key_prices['au_td'].get('stale', False)
+            logger.info(f"✓ 使用黄金延期Au(T+D)价格: {current_price} 元/克")
+        # 最后使用期货主力合约价格
+        elif key_prices.get('futures_main'):
+            current_price = key_prices['futures_main']['price']
+            price_instrument = key_prices['futures_main'].get('instrument')
+            price_market = 'shfe'
+            price_stale = key_prices['futures_main'].get('stale', False)
+            logger.info(f"✓ 使用沪金主力合约价格: {current_price} 元/克")
 
         if all_xiaoxiao_data:
             # 提取银行金价
             bank_gold_list = all_xiaoxiao_data.get('bank_gold_bar_price', [])
             if bank_gold_list:
-                # 转换为key_bank_prices格式
-                for item in bank_gold_list:
-                    bank_name = item.get('bank', '')
-                    price = float(item.get('price', 0))
-
-                    if '工商银行' in bank_name or '工行' in bank_name:
-                        bank_prices['icbc'] = {'name': bank_name, 'price': price, 'type': '投资金条'}
-                    elif '建设银行' in bank_name or '建行' in bank_name:
-                        bank_prices['ccb'] = {'name': bank_name, 'price': price, 'type': '投资金条'}
-                    elif '中国银行' in bank_name or '中行' in bank_name:
-                        bank_prices['boc'] = {'name': bank_name, 'price': price, 'type': '投资金条'}
-                    elif '农业银行' in bank_name or '农行' in bank_name:
-                        bank_prices['abc'] = {'name': bank_name, 'price': price, 'type': '投资金条'}
-                    elif '浦发银行' in bank_name or '浦发' in bank_name:
-                        bank_prices['spdb'] = {'name': bank_name, 'price': price, 'type': '投资金条'}
-                    elif '平安' in bank_name:
-                        bank_prices['pingan'] = {'name': bank_name, 'price': price, 'type': '投资金条'}
+                # 转换为key_bank_prices格式（只保留获取到的银行）
+                key_banks = self.xiaoxiao_api.extract_key_bank_prices(bank_gold_list)
+                bank_prices = {code: item for code, item in key_banks.items() if item}
 
                 if bank_prices:
                     key_prices['bank_prices'] = bank_prices
-                    bank_count = sum(1 for v in bank_prices.values() if v)
-                    logger.info(f"✓ 成功获取 {bank_count} 家银行金价")
+                    logger.info(f"✓ 成功获取 {len(bank_prices)} 家银行金价")
 
                     # 如果没有上海金交所数据，使用工商银行金价作为当前价格
                     if current_price is None and bank_prices.get('icbc'):
                         current_price = bank_prices['icbc']['price']
+                        price_instrument = bank_prices['icbc'].get('instrument')
                         logger.info(f"✓ 使用工商银行金条价格: {current_price} 元/克")
 
             # 提取品牌金店价格（前5家）
@@ -348,63 +712,269 @@ def main():
                 key_prices['recycle_prices'] = recycle_prices
                 logger.info(f"✓ 成功获取 {len(recycle_prices)} 种回收价格")
 
-    except Exception as e:
-        logger.warning(f"小小API获取失败: {e}")
+        if price_stale:
+            logger.warning("当前价格来自开市期间的过时缓存行情，不写入极值窗口")
+        return {
+            'current_price': current_price,
+            'price_instrument': price_instrument,
+            'price_market': price_market,
+            'price_stale': price_stale,
+            'stale_series': [key_prices[key]['instrument'] for key in EXCHANGE_KEYS
+                             if key_prices.get(key) and key_prices[key].get('stale')],
+            'key_prices': key_prices,
+            'series': build_series(key_prices, all_xiaoxiao_data),
+        }
 
-    # 如果所有数据源都失败，使用备用数据源
-    if current_price is None:
-        logger.info("=" * 60)
+    def _apply_fallback(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """所有数据源都失败时使用备用数据源"""
+        logger = self.logger
         logger.info("使用备用数据源获取金价...")
-        logger.info("=" * 60)
 
-        price_data = fetch_gold_price_fallback(logger)
+        fallback_config = self.config.get_fallback_config()
+        price_data = fetch_gold_price_fallback(
+            logger,
+            self.session,
+            priority=fallback_config['sources'],
+            hedge_delay=fallback_config['hedge_delay']
+        )
         if not price_data:
-            logger.error("无法获取金价，本次运行结束")
-            sys.exit(1)
-
-        current_price = price_data['price']
-        logger.info(f"当前金价: {current_price} 元/克 (来源: {price_data['source']})")
+            logger.error("无法获取金价")
+            return snapshot
+
+        snapshot['current_price'] = price_data['price']
+        logger.info(f"当前金价: {price_data['price']} 元/克 (来源: {price_data['source']})")
+        return snapshot
+
+    def _analyze(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """分析价格和各品种行情，并将本次结果追加到历史"""
+        logger = self.logger
+        current_price = snapshot['current_price']
+        price_market = snapshot['price_market']
+        key_prices = snapshot['key_prices']
+        series = snapshot['series']
+
+        # 分析价格
+        suppressed = self.alert_state.suppressed
+        alert_result = analyze_price(current_price, self.window, self.threshold, logger)
+        self.alert_state.apply(alert_result)
+
+        # 1小时、24小时、7天价格概况
+        alert_result['windows'] = self.history_store.summarize_windows(rolling=self.summary_windows)
+        for name, summary in alert_result['windows'].items():
+            if summary['data_points']:
+                logger.info(f"{name} 窗口: {summary['data_points']} 个数据点, "
+                            f"最高 {summary['highest']} 元/克, 最低 {summary['lowest']} 元/克")
+
+        # 将聚合数据API的关键金价添加到提醒结果中
+        if key_prices:
+            alert_result.update(key_prices)
+
+        # 所有数据源的行情按品种分析（当前价格对应的品种已在上面作为主价格分析过，不再重复提醒）
+        price_instrument = snapshot['price_instrument']
+        series_analysis = analyze_series(
+            {instrument: price for instrument, price in series.items() if instrument != price_instrument},
+            self.instrument_windows, self.threshold, logger
+        )
+        alert_result['instrument_alerts'] = {
+            instrument: result for instrument, result in series_analysis.items()
+            if self.alert_state.apply(result, instrument)['should_alert']
+        }
+        logger.info(f"本次记录 {len(series)} 个品种行情，"
+                    f"{len(alert_result['instrument_alerts'])} 个品种满足提醒条件")
+        # 主价格无需提醒但有品种满足条件时同样发送邮件（品种提醒已计入状态机，不发送就会丢失）
+        if alert_result['instrument_alerts'] and not alert_result['should_alert']:
+            alert_result['should_alert'] = True
+            alert_result['alert_level'] = max(
+                (result['alert_level'] for result in alert_result['instrument_alerts'].values()),
+                key=LEVEL_RANK.get
+            )
+            alert_result['alert_reasons'] = [
+                f"{len(alert_result['instrument_alerts'])} 个品种满足提醒条件，详见品种提醒"
+            ]
+        if self.alert_state.suppressed > suppressed:
+            logger.info(f"本次抑制 {self.alert_state.suppressed - suppressed} 条重复提醒")
+
+        # 保存当前价格和全部品种行情到历史（每次运行只追加一行）
+        record = {
+            'price': current_price,
+            'source': 'juhe-api' if self.juhe_api_key else 'fallback',
+            'timestamp': datetime.now().isoformat()
+        }
+        frozen_series: List[str] = []
+        if series:
+            record['series'] = series
+            stale_series = snapshot['stale_series']
+            frozen_series = update_instrument_windows(series, self.instrument_windows, record['timestamp'],
+                                                      stale=stale_series)
+            if frozen_series:
+                record['frozen_series'] = frozen_series
+            if stale_series:
+                record['stale_series'] = stale_series
+        # 休市期间与上一条相同的行情是冻结报价，开市期间来自过期缓存的是过时行情，标记后都不参与极值计算
+        history = self.history_store.records
+        if snapshot['price_stale']:
+            record['stale'] = True
+        elif (price_market and not is_market_open(price_market)
+                and history and history[-1]['price'] == current_price):
+            record['frozen'] = True
+            logger.info(f"{price_market.upper()} 休市中，本次价格为冻结报价")
+        else:
+            # 24小时窗口（self.window）也在其中
+            for window in self.summary_windows.values():
+                window.push(current_price, record['timestamp'])
+        self.history_store.append(record)
+        self._store_prices(record, frozen_series)
+
+        return alert_result
+
+    def _store_prices(self, record: Dict[str, Any], frozen_series: List[str]):
+        """将本次进入滚动窗口的价格（不含冻结和过时报价）在一个事务中写入数据库"""
+        skipped = set(frozen_series) | set(record.get('stale_series', ()))
+        rows = [
+            {'product_name': instrument, 'price': price, 'source': record['source'],
+             'timestamp': record['timestamp']}
+            for instrument, price in record.get('series', {}).items() if instrument not in skipped
+        ]
+        if not (record.get('frozen') or record.get('stale')):
+            rows.append({'product_name': 'AU9999', 'price': record['price'], 'source': record['source'],
+                         'timestamp': record['timestamp']})
+        try:
+            self.db.insert_prices(rows)
+        except Exception as e:
+            self.logger.warning(f"写入价格数据库失败: {e}")
+
+    def _notify(self, alert_result: Dict[str, Any]):
+        """判断是否需要发送提醒并发送邮件"""
+        logger = self.logger
+        force_alert = os.environ.get('FORCE_ALERT', 'false').lower() == 'true'
+
+        if force_alert:
+            logger.info("=" * 60)
+            logger.info("强制发送邮件模式（测试用）")
+            logger.info("=" * 60)
+            alert_result['should_alert'] = True
+            alert_result['alert_level'] = 'TEST'
+            if not alert_result.get('alert_reasons'):
+                alert_result['alert_reasons'] = ['测试邮件 - 手动触发']
+
+        if alert_result['should_alert']:
+            logger.info(f"触发提醒! 等级: {alert_result['alert_level']}")
+            for reason in alert_result['alert_reasons']:
+                logger.info(f"  原因: {reason}")
+
+            # 发送邮件
+            send_email_alert(alert_result, self.config, logger, self.outbox, self.outbox_worker)
+        else:
+            logger.info("价格正常，无需提醒")
+
+    def checkpoint(self):
+        """将滚动窗口和提醒状态写入磁盘（历史记录每次运行已追加，无需在此写入）"""
+        self.window.save(logger=self.logger)
+        save_series_windows(self.instrument_windows, logger=self.logger)
+        self.alert_state.save()
+
+    def _send_batch(self, recipient_emails: List[str], alert_data: Dict[str, Any]) -> Dict[str, bool]:
+        """投递线程使用的批量发送函数"""
+        results = create_notifier(self.config).send_batch_emails(recipient_emails, alert_data)
+        self.logger.info(f"邮件发送完成: 成功 {sum(results.values())}/{len(results)}")
+        return results
+
+    def close(self):
+        """保存状态、等待发件箱投递完成（超时后未发送的邮件留待下次运行）并释放连接"""
+        self.checkpoint()
+        self.outbox_worker.stop(timeout=OUTBOX_FLUSH_TIMEOUT)
+        if self.outbox.pending_count():
+            self.logger.warning(f"发件箱仍有 {self.outbox.pending_count()} 封邮件待发送")
+        get_fx_rate_cache(self.logger).wait_for_refresh(timeout=FX_REFRESH_TIMEOUT)
+        self.db.close()
+        close_session()
+
+
+def run_daemon(monitor: GoldMonitor, interval: float, checkpoint_interval: float,
+               logger: logging.Logger):
+    """
+    常驻模式：进程内按固定间隔轮询，状态保存在内存中，定期写入磁盘
 
-    # 加载历史价格
-    history = load_price_history(logger)
-    logger.info(f"历史记录: {len(history)} 条")
+    Args:
+        monitor: 金价监控
+        interval: 轮询间隔（秒）
+        checkpoint_interval: 状态写入磁盘的间隔（秒）
+        logger: 日志记录器
+    """
+    stop = threading.Event()
 
-    # 分析价格
-    alert_result = analyze_price(current_price, history, threshold, logger)
+    def handle_signal(signum, frame):
+        logger.info(f"收到信号 {signum}，准备退出")
+        stop.set()
 
-    # 将聚合数据API的关键金价添加到提醒结果中
-    if key_prices:
-        alert_result.update(key_prices)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, handle_signal)
 
-    # 保存当前价格到历史
-    history.append({
-        'price': current_price,
-        'source': 'juhe-api' if juhe_api_key else 'fallback',
-        'timestamp': datetime.now().isoformat()
-    })
-    save_price_history(history, logger)
-
-    # 判断是否需要发送提醒
-    force_alert = os.environ.get('FORCE_ALERT', 'false').lower() == 'true'
-
-    if force_alert:
-        logger.info("=" * 60)
-        logger.info("强制发送邮件模式（测试用）")
-        logger.info("=" * 60)
-        alert_result['should_alert'] = True
-        alert_result['alert_level'] = 'TEST'
-        if not alert_result.get('alert_reasons'):
-            alert_result['alert_reasons'] = ['测试邮件 - 手动触发']
-
-    if alert_result['should_alert']:
-        logger.info(f"触发提醒! 等级: {alert_result['alert_level']}")
-        for reason in alert_result['alert_reasons']:
-            logger.info(f"  原因: {reason}")
-
-        # 发送邮件
-        send_email_alert(alert_result, config, logger)
+    logger.info(f"常驻模式启动: 轮询间隔 {interval} 秒，状态保存间隔 {checkpoint_interval} 秒")
+    last_checkpoint = time.monotonic()
+    try:
+        while not stop.is_set():
+            started = time.monotonic()
+            try:
+                monitor.run_cycle()
+            except Exception as e:
+                logger.error(f"本轮监控失败: {e}")
+            logger.info(f"本轮耗时 {time.monotonic() - started:.2f} 秒")
+
+            if time.monotonic() - last_checkpoint >= checkpoint_interval:
+                monitor.checkpoint()
+                last_checkpoint = time.monotonic()
+
+            # 按上一轮开始时间对齐，避免耗时累积造成漂移
+            stop.wait(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        monitor.close()
+        logger.info("常驻模式已退出")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='积存金价格监控')
+    parser.add_argument('--daemon', action='store_true', help='常驻运行，按间隔持续轮询')
+    parser.add_argument('--interval', type=float, default=None,
+                        help='常驻模式轮询间隔（秒），默认读取 POLL_INTERVAL')
+    parser.add_argument('--checkpoint-interval', type=float, default=None,
+                        help='常驻模式状态保存间隔（秒），默认读取 CHECKPOINT_INTERVAL')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    """主函数 - 默认单次运行（聚合数据版），--daemon 时常驻运行"""
+    args = parse_args(argv)
+    logger = setup_logger()
+    logger.info("=" * 60)
+    if args.daemon:
+        logger.info("积存金价格监控 - 常驻模式（聚合数据版）")
     else:
-        logger.info("价格正常，无需提醒")
+        logger.info("积存金价格监控 - GitHub Actions 单次运行（聚合数据版）")
+    logger.info(f"运行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("=" * 60)
+
+    config = load_config(logger)
+    monitor = GoldMonitor(config, logger)
+
+    if args.daemon:
+        daemon_config = config.get_daemon_config()
+        run_daemon(
+            monitor,
+            args.interval or daemon_config['poll_interval'],
+            args.checkpoint_interval or daemon_config['checkpoint_interval'],
+            logger
+        )
+        return
+
+    try:
+        result = monitor.run_cycle()
+    finally:
+        monitor.close()
+    if result is None:
+        logger.error("无法获取金价，本次运行结束")
+        sys.exit(1)
 
     logger.info("=" * 60)
     logger.info("本次运行完成")
@@ -2,31 +2,114 @@
 各大银行金价爬虫模块
 支持爬取工商银行、建设银行、中国银行、农业银行、招商银行的账户金价
 """
+import time
 import requests
-from bs4 import BeautifulSoup
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+from api.http_session import get_session
+from scrapers.html_extractor import RowSelector
+
+# 单个站点默认超时（秒）
+DEFAULT_SITE_TIMEOUT = 15
+
+# 个别站点的超时（秒），未列出的使用默认值
+SITE_TIMEOUTS = {
+    'www.abchina.com': 10,
+    'www.cmbchina.com': 10,
+}
+
+# 各银行页面中金价所在行的选择器（首列含关键字，第2、3列为买入价、卖出价），模块加载时编译一次
+# 注：需要根据实际页面结构调整
+BANK_SELECTORS = {
+    'boc': RowSelector('黄金'),
+    'abc': RowSelector('黄金'),
+    'cmb': RowSelector('黄金'),
+}
 
 
 class BankGoldScraper:
-    """银行金价爬虫"""
+    """
+    银行金价爬虫
+
+    所有银行并发抓取，总耗时取决于最慢的站点而不是银行数量；
+    同一主机的请求受并发数和最小间隔限制，避免对单个站点造成压力
+    """
 
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None,
+                 session: Optional[requests.Session] = None,
+                 max_workers: int = 8, per_host_limit: int = 1, min_host_interval: float = 1.0,
+                 site_timeouts: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            logger: 日志记录器
+            session: HTTP会话，默认使用共享会话
+            max_workers: 最大并发抓取数
+            per_host_limit: 同一主机的最大并发请求数
+            min_host_interval: 同一主机两次请求之间的最小间隔（秒）
+            site_timeouts: {主机: 超时秒数}，覆盖 SITE_TIMEOUTS 中的设置
+        """
         self.logger = logger or logging.getLogger(__name__)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # 共享会话已带浏览器 User-Agent 与 keep-alive 连接池
+        self.session = session or get_session()
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.min_host_interval = min_host_interval
+        self.site_timeouts = {**SITE_TIMEOUTS, **(site_timeouts or {})}
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.Semaphore] = {}
+        self._host_last_request: Dict[str, float] = {}
 
-    def fetch_icbc_gold(self) -> Optional[Dict]:
+    @property
+    def scrapers(self) -> List[tuple]:
+        """(银行名称, 抓取函数) 列表，新增银行只需在此登记（抓取函数接受可选的截止时间参数）"""
+        return [
+            ('建设银行', self.fetch_ccb_gold),
+            ('中国银行', self.fetch_boc_gold),
+            ('农业银行', self.fetch_abc_gold),
+            ('招商银行', self.fetch_cmb_gold),
+        ]
+
+    def _get(self, url: str, deadline: Optional[float] = None) -> requests.Response:
+        """
+        按主机限流后发起 GET 请求
+
+        Args:
+            url: 请求地址
+            deadline: 所属批次的截止时间（time.monotonic() 时间），超时取站点超时与剩余时间中的较小值
+        """
+        host = urlparse(url).hostname or ''
+        timeout = self.site_timeouts.get(host, DEFAULT_SITE_TIMEOUT)
+
+        with self._lock:
+            slots = self._host_slots.setdefault(host, threading.Semaphore(self.per_host_limit))
+
+        with slots:
+            with self._lock:
+                wait = self._host_last_request.get(host, 0) + self.min_host_interval - time.monotonic()
+                self._host_last_request[host] = time.monotonic() + max(wait, 0)
+            if wait > 0:
+                time.sleep(wait)
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.Timeout(f"{host} 未在总截止时间内开始请求")
+                timeout = min(timeout, remaining)
+            return self.session.get(url, timeout=timeout)
+
+    def fetch_icbc_gold(self, deadline: Optional[float] = None) -> Optional[Dict]:
         """
         获取工商银行金价（通过极速数据API）
         注：这个方法保留作为参考，实际使用时调用极速数据API
         """
         return None
 
-    def fetch_ccb_gold(self) -> Optional[Dict]:
+    def fetch_ccb_gold(self, deadline: Optional[float] = None) -> Optional[Dict]:
         """
         获取建设银行金价
         建行账户贵金属API接口
@@ -34,7 +117,7 @@ class BankGoldScraper:
         try:
             # 建行有公开的API接口
             url = 'https://ibsbjstar.ccb.com.cn/CCBIS/V6/common/goldPrice.do'
-            resp = self.session.get(url, timeout=15)
+            resp = self._get(url, deadline)
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -56,7 +139,29 @@ class BankGoldScraper:
             self.logger.warning(f"建设银行金价获取异常: {e}")
             return None
 
-    def fetch_boc_gold(self) -> Optional[Dict]:
+    def _parse_gold_row(self, bank_name: str, page: str, selector: RowSelector) -> Optional[Dict]:
+        """
+        从页面中提取金价行（找到第一行即停止解析）
+
+        Returns:
+            金价字典，未找到金价行或价格无效时返回 None
+        """
+        cells = selector.find(page)
+        if not cells:
+            return None
+        try:
+            buy_price, sell_price = float(cells[1].replace(',', '')), float(cells[2].replace(',', ''))
+        except ValueError:
+            self.logger.warning(f"{bank_name}金价行格式无法识别: {cells}")
+            return None
+        return {
+            'bank_name': bank_name,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def fetch_boc_gold(self, deadline: Optional[float] = None) -> Optional[Dict]:
         """
         获取中国银行金价
         中行贵金属行情API
@@ -64,24 +169,12 @@ class BankGoldScraper:
         try:
             # 中行有公开的贵金属行情接口
             url = 'https://www.boc.cn/sourcedb/whpj/index_1619.html'
-            resp = self.session.get(url, timeout=15)
+            resp = self._get(url, deadline)
 
             if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                # 解析HTML表格，查找黄金价格
-                # 注：需要根据实际页面结构调整选择器
-                table = soup.find('table')
-                if table:
-                    rows = table.find_all('tr')
-                    for row in rows:
-                        cols = row.find_all('td')
-                        if len(cols) >= 3 and '黄金' in cols[0].text:
-                            return {
-                                'bank_name': '中国银行',
-                                'buy_price': float(cols[1].text.strip()),
-                                'sell_price': float(cols[2].text.strip()),
-                                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            }
+                result = self._parse_gold_row('中国银行', resp.text, BANK_SELECTORS['boc'])
+                if result:
+                    return result
 
             self.logger.warning("中国银行金价获取失败")
             return None
@@ -90,7 +183,7 @@ class BankGoldScraper:
             self.logger.warning(f"中国银行金价获取异常: {e}")
             return None
 
-    def fetch_abc_gold(self) -> Optional[Dict]:
+    def fetch_abc_gold(self, deadline: Optional[float] = None) -> Optional[Dict]:
         """
         获取农业银行金价
         农行账户贵金属
@@ -98,12 +191,12 @@ class BankGoldScraper:
         try:
             # 农行的金价查询接口（需要根据实际情况调整）
             url = 'http://www.abchina.com/cn/PersonalServices/Precious/preciousquery/'
-            resp = self.session.get(url, timeout=15)
+            resp = self._get(url, deadline)
 
             if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                # 解析页面，提取金价数据
-                # 注：需要根据实际页面结构调整
+                result = self._parse_gold_row('农业银行', resp.text, BANK_SELECTORS['abc'])
+                if result:
+                    return result
 
                 self.logger.info("农业银行金价页面获取成功，需要进一步解析")
                 return None
@@ -115,7 +208,7 @@ class BankGoldScraper:
             self.logger.warning(f"农业银行金价获取异常: {e}")
             return None
 
-    def fetch_cmb_gold(self) -> Optional[Dict]:
+    def fetch_cmb_gold(self, deadline: Optional[float] = None) -> Optional[Dict]:
         """
         获取招商银行金价
         招行纸黄金
@@ -123,12 +216,12 @@ class BankGoldScraper:
         try:
             # 招行纸黄金查询接口
             url = 'https://www.cmbchina.com/personal/common.aspx?pageid=hjjygc'
-            resp = self.session.get(url, timeout=15)
+            resp = self._get(url, deadline)
 
             if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                # 解析页面，提取金价数据
-                # 注：需要根据实际页面结构调整
+                result = self._parse_gold_row('招商银行', resp.text, BANK_SELECTORS['cmb'])
+                if result:
+                    return result
 
                 self.logger.info("招商银行金价页面获取成功，需要进一步解析")
                 return None
@@ -140,33 +233,46 @@ class BankGoldScraper:
             self.logger.warning(f"招商银行金价获取异常: {e}")
             return None
 
-    def fetch_all_banks(self) -> List[Dict]:
+    def fetch_all_banks(self, deadline: float = 30.0,
+                        on_result: Optional[Callable[[str, Optional[Dict]], None]] = None) -> List[Dict]:
         """
-        获取所有银行的金价
+        并发获取所有银行的金价，按完成顺序收集结果
+
+        Args:
+            deadline: 整批抓取的总截止时间（秒），超时未完成的银行记为失败
+            on_result: 可选回调，每家银行完成时立即调用 on_result(银行名称, 结果)
 
         Returns:
-            银行金价列表
+            银行金价列表（按完成顺序）
         """
         banks = []
+        scrapers = self.scrapers
+        # 截止时间随每个任务传入，被放弃的任务和同时进行的其他批次互不影响
+        batch_deadline = time.monotonic() + deadline
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(scrapers)))
+        futures = {executor.submit(scraper_func, batch_deadline): bank_name for bank_name, scraper_func in scrapers}
 
-        # 尝试获取各家银行的金价
-        scrapers = [
-            ('建设银行', self.fetch_ccb_gold),
-            ('中国银行', self.fetch_boc_gold),
-            ('农业银行', self.fetch_abc_gold),
-            ('招商银行', self.fetch_cmb_gold),
-        ]
-
-        for bank_name, scraper_func in scrapers:
-            try:
-                result = scraper_func()
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                bank_name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.logger.error(f"✗ {bank_name}金价获取异常: {e}")
+                    result = None
                 if result:
                     banks.append(result)
                     self.logger.info(f"✓ {bank_name}金价获取成功")
                 else:
                     self.logger.warning(f"✗ {bank_name}金价获取失败")
-            except Exception as e:
-                self.logger.error(f"✗ {bank_name}金价获取异常: {e}")
+                if on_result:
+                    on_result(bank_name, result)
+        except FuturesTimeoutError:
+            pending = [bank_name for future, bank_name in futures.items() if not future.done()]
+            self.logger.warning(f"已达到总截止时间 {deadline}s，放弃未完成的银行: {', '.join(pending)}")
+        finally:
+            # 不等待仍在进行的请求，直接返回已完成的结果
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return banks
 
@@ -0,0 +1,102 @@
+"""
+HTML 表格行提取模块 - 银行页面只需找到金价所在的一行
+不构建整个页面的 DOM：有 lxml 时用增量解析器逐块喂入页面，否则用预编译正则逐行扫描，
+找到目标行后立即停止解析
+"""
+import re
+import html
+from typing import List, Optional
+
+try:
+    from lxml import etree
+except ImportError:  # lxml 为可选依赖，未安装时使用正则提取
+    etree = None
+
+# 增量解析时每次喂入的字符数
+CHUNK_SIZE = 64 * 1024
+
+ROW_PATTERN = re.compile(r'<tr\b[^>]*>(.*?)(?=<tr\b|</tr\s*>|</table\s*>|$)', re.IGNORECASE | re.DOTALL)
+CELL_PATTERN = re.compile(r'<t[dh]\b[^>]*>(.*?)(?=<t[dh]\b|</t[dh]\s*>|$)', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+SPACE_PATTERN = re.compile(r'\s+')
+
+
+def _clean(text: str, markup: bool = True) -> str:
+    """去除标签、实体（markup 为 False 时文本已由解析器处理）和多余空白"""
+    if markup:
+        text = html.unescape(TAG_PATTERN.sub('', text))
+    return SPACE_PATTERN.sub(' ', text).strip()
+
+
+class RowSelector:
+    """表格行选择器：第 keyword_column 列包含关键字且列数足够的第一行"""
+
+    def __init__(self, keyword: str, min_columns: int = 3, keyword_column: int = 0,
+                 backend: Optional[str] = None):
+        """
+        Args:
+            keyword: 目标行的关键字，如 '黄金'
+            min_columns: 目标行至少包含的单元格数
+            keyword_column: 关键字所在列
+            backend: 'lxml' 或 'regex'，默认有 lxml 时使用 lxml
+        """
+        self.keyword = keyword
+        self.min_columns = min_columns
+        self.keyword_column = keyword_column
+        self.backend = backend or ('lxml' if etree is not None else 'regex')
+        if self.backend == 'lxml' and etree is None:
+            raise ValueError("未安装 lxml，无法使用 lxml 解析")
+
+    def _matches(self, cells: List[str]) -> bool:
+        return len(cells) >= self.min_columns and self.keyword in cells[self.keyword_column]
+
+    def find(self, page: str) -> Optional[List[str]]:
+        """
+        查找目标行
+
+        Args:
+            page: 页面 HTML
+
+        Returns:
+            目标行各单元格的文本，未找到返回 None
+        """
+        if self.backend == 'lxml':
+            return self._find_lxml(page)
+        return self._find_regex(page)
+
+    def _find_regex(self, page: str) -> Optional[List[str]]:
+        # finditer 逐行惰性匹配，先用关键字过滤，只拆分可能命中的行
+        for row in ROW_PATTERN.finditer(page):
+            body = row.group(1)
+            if self.keyword not in body:
+                continue
+            cells = [_clean(cell) for cell in CELL_PATTERN.findall(body)]
+            if self._matches(cells):
+                return cells
+        return None
+
+    def _find_lxml(self, page: str) -> Optional[List[str]]:
+        parser = etree.HTMLPullParser(events=('end',), tag='tr')
+        for start in range(0, len(page), CHUNK_SIZE):
+            parser.feed(page[start:start + CHUNK_SIZE])
+            cells = self._scan_events(parser)
+            if cells:
+                return cells
+        # 结束解析，补发页面末尾未闭合的行的结束事件
+        parser.close()
+        return self._scan_events(parser)
+
+    def _scan_events(self, parser) -> Optional[List[str]]:
+        """检查解析器已产生的行"""
+        for _, row in parser.read_events():
+            # 先只检查关键字所在列，命中后再提取整行
+            if len(row) > self.keyword_column and self.keyword in ''.join(row[self.keyword_column].itertext()):
+                cells = [_clean(''.join(cell.itertext()), markup=False)
+                         for cell in row if cell.tag in ('td', 'th')]
+                if self._matches(cells):
+                    return cells
+            # 已检查的行立即释放，内存占用与页面大小无关
+            row.clear()
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+        return None
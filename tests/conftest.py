@@ -0,0 +1,7 @@
+"""
+测试配置：将项目根目录加入导入路径，与 run_once.py 一样使用绝对导入
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
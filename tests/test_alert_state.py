@@ -0,0 +1,104 @@
+"""
+提醒状态机测试：首次提醒、升级、滞回解除、冷却、结果过滤和状态清理
+"""
+import json
+
+from alerts.alert_state import STATE_RETENTION_SECONDS, AlertStateMachine, alert_signal
+
+
+def drop(severity, trigger_at=5.0):
+    return alert_signal('drop', severity, trigger_at, 'medium', f"下跌 {severity}%")
+
+
+def machine(**kwargs):
+    options = {'path': None, 'cooldown_seconds': 1000, 'hysteresis': 0.5, 'escalation_step': 1.0}
+    options.update(kwargs)
+    return AlertStateMachine(**options)
+
+
+def test_alert_signal_triggered_defaults_to_threshold():
+    assert drop(5.0)['triggered']
+    assert not drop(4.9)['triggered']
+    assert alert_signal('new_low', 1.0, 3.0, 'high', '', triggered=True)['triggered']
+
+
+def test_first_alert_then_only_escalations():
+    state = machine()
+    assert state.evaluate('au', drop(5.5), now=0)
+    assert not state.evaluate('au', drop(6.0), now=10)
+    assert state.evaluate('au', drop(6.5), now=20)      # 比上次提醒加深 1 个百分点
+    assert not state.evaluate('au', drop(7.0), now=30)  # 升级以上次提醒的程度为基准
+    assert state.sent == 2
+    assert state.suppressed == 2
+
+
+def test_hysteresis_keeps_alert_active_near_threshold():
+    state = machine(cooldown_seconds=0)
+    assert state.evaluate('au', drop(5.5), now=0)
+    assert not state.evaluate('au', drop(4.8), now=10)  # 仍在滞回区间内，不解除
+    assert state.states['au:drop']['active']
+    assert not state.evaluate('au', drop(5.2), now=20)  # 未解除，回到阈值以上不算新提醒
+    assert not state.evaluate('au', drop(4.4), now=30)  # 低于 5.0 - 0.5，解除
+    assert not state.states['au:drop']['active']
+    assert state.evaluate('au', drop(5.2), now=40)      # 无冷却时间，再次触发即提醒
+
+
+def test_cooldown_suppresses_retrigger_unless_escalated():
+    state = machine(cooldown_seconds=100)
+    assert state.evaluate('au', drop(5.5), now=0)
+    assert not state.evaluate('au', drop(4.0), now=10)
+    assert not state.evaluate('au', drop(5.5), now=50)  # 冷却期内再次触发
+    assert not state.evaluate('au', drop(4.0), now=60)
+    assert state.evaluate('au', drop(6.5), now=70)      # 冷却期内但程度加深
+    assert not state.evaluate('au', drop(4.0), now=80)
+    assert state.evaluate('au', drop(5.5), now=500)     # 冷却结束
+
+
+def test_states_are_per_instrument_and_reason():
+    state = machine()
+    assert state.evaluate('au', drop(5.5), now=0)
+    assert state.evaluate('ag', drop(5.5), now=0)
+    assert state.evaluate('au', alert_signal('volatility', 3.5, 3.0, 'low', ''), now=0)
+
+
+def test_apply_keeps_only_alerted_reasons():
+    state = machine()
+    signals = [
+        alert_signal('new_low', 6.0, 4.0, 'high', '最低价', triggered=True),
+        drop(6.0),
+        alert_signal('volatility', 2.0, 3.0, 'low', '波动'),
+    ]
+    result = state.apply({'product_name': 'au', 'should_alert': True, 'alert_signals': signals}, now=0)
+    assert result['should_alert']
+    assert result['alert_reasons'] == ['最低价', '下跌 6.0%']
+    assert result['alert_level'] == 'high'
+
+    # 最低价条件持续但未加深，只有升级的下跌原因再次提醒
+    signals[1] = drop(7.0)
+    result = state.apply({'product_name': 'au', 'should_alert': True, 'alert_signals': signals}, now=10)
+    assert result['alert_reasons'] == ['下跌 7.0%']
+    assert result['alert_level'] == 'medium'
+
+    result = state.apply({'product_name': 'au', 'should_alert': True, 'alert_signals': signals}, now=20)
+    assert not result['should_alert']
+    assert result['alert_reasons'] == []
+    assert result['alert_level'] == 'none'
+
+
+def test_apply_without_signals_leaves_result_untouched():
+    result = {'product_name': 'au', 'should_alert': False, 'alert_reasons': ['首次运行，无历史数据']}
+    assert machine().apply(result) == result
+
+
+def test_save_prunes_stale_states_and_reloads(tmp_path):
+    path = tmp_path / 'alert_state.json'
+    state = machine(path=str(path))
+    state.evaluate('old', drop(5.5), now=0)
+    state.evaluate('au', drop(5.5), now=STATE_RETENTION_SECONDS)
+    state.save(now=STATE_RETENTION_SECONDS + 1)
+
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    assert set(saved) == {'au:drop'}
+    reloaded = machine(path=str(path))
+    assert reloaded.states['au:drop']['active']
+    assert not reloaded.evaluate('au', drop(5.5), now=STATE_RETENTION_SECONDS + 2)
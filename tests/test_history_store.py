@@ -0,0 +1,130 @@
+"""
+历史价格存储测试：追加写入、按时长过期、压缩阈值、时间窗口查询和旧版文件迁移
+"""
+import json
+from datetime import datetime
+
+from alerts.rolling_extremes import RollingExtremes
+from database.history_store import HistoryStore
+
+BASE = datetime(2026, 10, 13, 12, 0).timestamp()
+
+
+def record(offset, price=500.0, **fields):
+    return {'price': price, 'timestamp': datetime.fromtimestamp(BASE + offset).isoformat(), **fields}
+
+
+def lines(path):
+    return [line for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+
+
+def make_store(tmp_path, **kwargs):
+    store = HistoryStore(path=str(tmp_path / 'history.jsonl'), legacy_path=None, **kwargs)
+    store.load(now=BASE)
+    return store
+
+
+def test_append_writes_one_line_per_record(tmp_path):
+    store = make_store(tmp_path)
+    store.append(record(0))
+    store.append(record(60, 501.0))
+    assert [json.loads(line)['price'] for line in lines(tmp_path / 'history.jsonl')] == [500.0, 501.0]
+
+    reloaded = make_store(tmp_path)
+    assert [item['price'] for item in reloaded.records] == [500.0, 501.0]
+
+
+def test_compaction_waits_for_enough_expired_lines(tmp_path):
+    path = tmp_path / 'history.jsonl'
+    store = make_store(tmp_path, retention_seconds=100, min_compact_lines=3)
+    for offset in (0, 1, 2):
+        store.append(record(offset))
+
+    store.append(record(101.5))  # 过期 2 行，少于 min_compact_lines，只追加
+    assert len(store.records) == 2
+    assert len(lines(path)) == 4
+
+    store.append(record(103))    # 过期 3 行，不少于有效行数，整体压缩
+    assert len(store.records) == 2
+    assert len(lines(path)) == 2
+    assert store.line_count == 2
+
+
+def test_compaction_requires_expired_lines_to_outnumber_live_ones(tmp_path):
+    path = tmp_path / 'history.jsonl'
+    store = make_store(tmp_path, retention_seconds=100, min_compact_lines=1)
+    for offset in range(50, 55):
+        store.append(record(offset))
+    store.append(record(140))    # 0 行过期
+    store.append(record(151.5))  # 过期 2 行（50、51），少于有效行数 5
+    assert len(lines(path)) == 7
+    store.append(record(154))    # 过期 4 行，不少于有效行数 4
+    assert len(lines(path)) == 4
+    assert [item['timestamp'] for item in store.records] == [
+        record(offset)['timestamp'] for offset in (54, 140, 151.5, 154)
+    ]
+
+
+def test_load_skips_expired_and_corrupt_lines(tmp_path):
+    path = tmp_path / 'history.jsonl'
+    path.write_text('\n'.join([
+        json.dumps(record(-8 * 24 * 3600)),
+        '{broken',
+        json.dumps({'price': 1}),
+        json.dumps(record(-60)),
+    ]) + '\n', encoding='utf-8')
+    store = make_store(tmp_path)
+    assert [item['timestamp'] for item in store.records] == [record(-60)['timestamp']]
+    assert store.line_count == 4  # 文件行数，含过期和损坏的行
+
+
+def test_window_uses_time_bounds_and_skips_frozen(tmp_path):
+    store = make_store(tmp_path)
+    store.append(record(0, 500.0))
+    store.append(record(1800, 505.0, frozen=True))
+    store.append(record(3000, 510.0, stale=True))
+    store.append(record(3500, 495.0))
+    now = BASE + 3600
+
+    assert [item['price'] for item in store.window(3600, now=now)] == [500.0, 505.0, 510.0, 495.0]
+    assert [item['price'] for item in store.window(3600, now=now, include_frozen=False)] == [500.0, 495.0]
+    assert [item['price'] for item in store.window(1000, now=now)] == [510.0, 495.0]
+    assert store.window(10, now=now) == []
+
+
+def test_series_samples_skip_frozen_and_stale_series(tmp_path):
+    store = make_store(tmp_path)
+    store.append(record(0, series={'sge.au9999': 500.0, 'bank.icbc': 600.0}))
+    store.append(record(60, series={'sge.au9999': 501.0, 'bank.icbc': 600.0},
+                        frozen_series=['bank.icbc'], stale_series=['sge.au9999']))
+    samples = store.series_samples(3600, now=BASE + 120)
+    assert samples == {'sge.au9999': [(500.0, BASE)], 'bank.icbc': [(600.0, BASE)]}
+
+
+def test_summarize_windows_matches_rolling_extremes(tmp_path):
+    store = make_store(tmp_path)
+    for offset, price in ((0, 480.0), (4 * 24 * 3600, 530.0), (6 * 24 * 3600 - 60, 500.0),
+                          (6 * 24 * 3600 + 3000, 510.0), (6 * 24 * 3600 + 3500, 505.0)):
+        store.append(record(offset, price))
+    now = BASE + 6 * 24 * 3600 + 3600
+
+    scanned = store.summarize_windows(now=now)
+    assert scanned['1h'] == {'data_points': 2, 'highest': 510.0, 'lowest': 505.0}
+    assert scanned['24h'] == {'data_points': 3, 'highest': 510.0, 'lowest': 500.0}
+    assert scanned['7d'] == {'data_points': 5, 'highest': 530.0, 'lowest': 480.0}
+
+    rolling = {'1h': RollingExtremes(3600), '24h': RollingExtremes(24 * 3600)}
+    for window in rolling.values():
+        window.extend((item['price'], item['timestamp']) for item in store.records)
+    assert store.summarize_windows(now=now, rolling=rolling) == scanned
+
+
+def test_legacy_file_is_migrated(tmp_path):
+    legacy = tmp_path / 'history.json'
+    legacy.write_text(json.dumps([record(0), record(60, 501.0)]), encoding='utf-8')
+    store = HistoryStore(path=str(tmp_path / 'history.jsonl'), legacy_path=str(legacy))
+    store.load(now=BASE + 120)
+
+    assert not legacy.exists()
+    assert [item['price'] for item in store.records] == [500.0, 501.0]
+    assert len(lines(tmp_path / 'history.jsonl')) == 2
@@ -0,0 +1,57 @@
+"""
+表格行提取测试：正则和 lxml 两种实现的结果一致（未安装 lxml 时跳过 lxml 用例）
+"""
+import pytest
+
+from scrapers import html_extractor
+from scrapers.html_extractor import RowSelector
+
+BACKENDS = [
+    'regex',
+    pytest.param('lxml', marks=pytest.mark.skipif(html_extractor.etree is None, reason='未安装 lxml')),
+]
+
+PAGE = """
+<html><body>
+<table>
+  <tr><th>品种</th><th>买入价</th><th>卖出价</th></tr>
+  <tr><td>白银</td><td>7.10</td><td>7.30</td></tr>
+  <tr><td>黄金</td><td>备注</td></tr>
+  <tr class="gold"><td><b>黄金</b>&nbsp;T+D</td><td> 560.10 </td><td>562.&#51;0</td></tr>
+  <tr><td>黄金</td><td>1</td><td>2</td></tr>
+</table>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_finds_first_matching_row_with_enough_columns(backend):
+    cells = RowSelector('黄金', backend=backend).find(PAGE)
+    assert cells == ['黄金 T+D', '560.10', '562.30']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_keyword_column_and_missing_row(backend):
+    assert RowSelector('7.10', keyword_column=1, backend=backend).find(PAGE) == ['白银', '7.10', '7.30']
+    assert RowSelector('白银', keyword_column=1, backend=backend).find(PAGE) is None
+    assert RowSelector('铂金', backend=backend).find(PAGE) is None
+    assert RowSelector('黄金', min_columns=4, backend=backend).find(PAGE) is None
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_unclosed_rows_and_cells(backend):
+    page = '<table><tr><td>白银<td>7.10<td>7.30<tr><td>黄金<td>560.10<td>562.30'
+    assert RowSelector('黄金', backend=backend).find(page) == ['黄金', '560.10', '562.30']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_row_spanning_chunks(backend, monkeypatch):
+    monkeypatch.setattr(html_extractor, 'CHUNK_SIZE', 16)
+    assert RowSelector('黄金', backend=backend).find(PAGE) == ['黄金 T+D', '560.10', '562.30']
+
+
+def test_lxml_backend_requires_lxml(monkeypatch):
+    monkeypatch.setattr(html_extractor, 'etree', None)
+    assert RowSelector('黄金').backend == 'regex'
+    with pytest.raises(ValueError):
+        RowSelector('黄金', backend='lxml')
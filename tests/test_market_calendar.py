@@ -0,0 +1,68 @@
+"""
+交易日历测试：日盘、跨零点夜盘、周末和节假日、北京时间换算
+"""
+from datetime import date, datetime, timezone
+
+import pytest
+
+from api import market_calendar
+from api.market_calendar import add_holidays, has_night_session, is_market_open, is_trading_day
+
+
+@pytest.mark.parametrize('market, when, expected', [
+    ('sge', datetime(2026, 10, 13, 10, 0), True),     # 周二上午
+    ('sge', datetime(2026, 10, 13, 12, 0), False),    # 午休
+    ('sge', datetime(2026, 10, 13, 15, 15), True),
+    ('shfe', datetime(2026, 10, 13, 15, 15), False),  # 上期所日盘 15:00 收盘
+    ('shfe', datetime(2026, 10, 13, 10, 20), False),  # 上期所上午小节休息
+    ('sge', datetime(2026, 10, 13, 10, 20), True),
+    ('sge', datetime(2026, 10, 13, 8, 59), False),
+])
+def test_day_sessions(market, when, expected):
+    assert is_market_open(market, when) is expected
+
+
+@pytest.mark.parametrize('market, when, expected', [
+    ('sge', datetime(2026, 10, 13, 20, 30), True),
+    ('shfe', datetime(2026, 10, 13, 20, 30), False),  # 上期所夜盘 21:00 开始
+    ('sge', datetime(2026, 10, 14, 1, 0), True),      # 周二夜盘跨过零点
+    ('sge', datetime(2026, 10, 14, 2, 30), False),
+    ('sge', datetime(2026, 10, 16, 22, 0), True),     # 周五夜盘
+    ('sge', datetime(2026, 10, 17, 1, 0), True),      # 周五夜盘延续到周六凌晨
+    ('sge', datetime(2026, 10, 17, 10, 0), False),    # 周六白天
+    ('sge', datetime(2026, 10, 17, 21, 0), False),    # 周六晚上没有夜盘
+    ('sge', datetime(2026, 10, 19, 1, 0), False),     # 周日晚上没有夜盘
+])
+def test_night_sessions(market, when, expected):
+    assert is_market_open(market, when) is expected
+
+
+def test_holidays_close_day_and_preceding_night_session():
+    assert not is_trading_day(date(2026, 10, 1))
+    assert not is_market_open('sge', datetime(2026, 10, 1, 10, 0))
+    # 节假日前最后一个交易日不开夜盘
+    assert is_trading_day(date(2026, 9, 30))
+    assert not has_night_session(date(2026, 9, 30))
+    assert not is_market_open('sge', datetime(2026, 9, 30, 21, 0))
+    assert not is_market_open('sge', datetime(2026, 10, 1, 1, 0))
+    # 长假后第一个交易日恢复日盘和夜盘
+    assert is_market_open('sge', datetime(2026, 10, 8, 10, 0))
+    assert has_night_session(date(2026, 10, 8))
+
+
+def test_aware_times_are_converted_to_beijing_time():
+    # UTC 01:30 即北京时间 09:30
+    assert is_market_open('sge', datetime(2026, 10, 13, 1, 30, tzinfo=timezone.utc))
+    assert not is_market_open('sge', datetime(2026, 10, 13, 0, 59, tzinfo=timezone.utc))
+    # UTC 周五 16:00 即北京时间周六 00:00，仍在周五夜盘内
+    assert is_market_open('sge', datetime(2026, 10, 16, 16, 0, tzinfo=timezone.utc))
+    assert not is_market_open('sge', datetime(2026, 10, 16, 18, 45, tzinfo=timezone.utc))
+
+
+def test_add_holidays(monkeypatch):
+    monkeypatch.setattr(market_calendar, 'HOLIDAYS', set(market_calendar.HOLIDAYS))
+    add_holidays(['2026-10-14', ' ', ''])
+    assert not is_trading_day(date(2026, 10, 14))
+    assert not is_market_open('sge', datetime(2026, 10, 14, 10, 0))
+    # 前一个交易日因此不开夜盘
+    assert not has_night_session(date(2026, 10, 13))